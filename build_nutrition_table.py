@@ -0,0 +1,94 @@
+import os
+import json
+import argparse
+import pandas as pd
+from food_analysis_service import glycemic_load_category, normalize_food_name
+
+# Build the food class -> nutrition table that lets food_analysis_service.py answer
+# calories and glycemic load for detected foods without calling the LLM.
+# Each detection class is matched against the food names in cleaned_diabetic_foods.csv;
+# classes without a match are left out and keep going to the LLM.
+# Usage: python build_nutrition_table.py
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="Build the local nutrition table for detected food classes")
+parser.add_argument("--foods-csv", default=os.path.join(
+    current_dir, "nutritional_assistant", "data preprocessing", "processed_data", "cleaned_diabetic_foods.csv"))
+parser.add_argument("--manifest", default=os.path.join(current_dir, "food_detection_model", "model_manifest.json"))
+parser.add_argument("--output", default=os.path.join(current_dir, "nutrition_table.json"))
+args = parser.parse_args()
+
+# Detection classes whose dataset name differs from any food name in the CSV
+ALIASES = {
+    "bhindi fry": "Bhindi Masala",
+    "bbq": "Chicken Kebab",
+    "omelette": "Eggs"
+}
+
+# Typical calories of one serving of each detection class (the CSV has no calories column)
+SERVING_CALORIES = {
+    "aloo gobi": 150,
+    "bhindi fry": 140,
+    "ras malai": 250,
+    "bbq": 250,
+    "biryani": 450,
+    "brownie": 230,
+    "butter chicken": 440,
+    "chai": 120,
+    "chapati": 120,
+    "chicken tikka": 280,
+    "french fries": 310,
+    "fried rice": 330,
+    "haleem": 380,
+    "omelette": 190,
+    "paratha": 260,
+    "paratha roll": 420,
+    "samosa": 260
+}
+
+def match_rows(class_name: str, foods: pd.DataFrame) -> pd.DataFrame:
+    """CSV rows for a class: exact name, then alias, then names containing every word of the class"""
+    normalized_names = foods["Food Name"].map(normalize_food_name)
+    key = normalize_food_name(class_name)
+    rows = foods[normalized_names == key]
+    if rows.empty and key in ALIASES:
+        rows = foods[normalized_names == normalize_food_name(ALIASES[key])]
+    if rows.empty:
+        words = key.split()
+        rows = foods[normalized_names.map(lambda name: all(word in name.split() for word in words))]
+    return rows
+
+foods = pd.read_csv(args.foods_csv)
+with open(args.manifest) as f:
+    classes = json.load(f)["classes"]
+
+table = {}
+unmatched = []
+for class_name in classes:
+    key = normalize_food_name(class_name)
+    rows = match_rows(class_name, foods)
+    if rows.empty or key not in SERVING_CALORIES:
+        unmatched.append(class_name)
+        continue
+
+    # The CSV repeats foods with varying carbohydrate estimates; take the median serving
+    glycemic_index = float(rows["Glycemic Index"].median())
+    carbohydrates = float(rows["Carbohydrates"].median())
+    glycemic_load = glycemic_index * carbohydrates / 100
+    table[key] = {
+        "food_class": class_name,
+        "matched_foods": sorted(rows["Food Name"].unique().tolist()),
+        "calories": SERVING_CALORIES[key],
+        "glycemic_index": round(glycemic_index, 1),
+        "carbohydrates": round(carbohydrates, 1),
+        "glycemic_load": round(glycemic_load, 1),
+        "glycemic_load_category": glycemic_load_category(glycemic_load)
+    }
+    print(f"{class_name}: {', '.join(table[key]['matched_foods'])} "
+          f"(GI {glycemic_index:.0f}, GL {glycemic_load:.1f}, {table[key]['glycemic_load_category']})")
+
+with open(args.output, "w") as f:
+    json.dump(table, f, indent=2)
+print(f"\n{len(table)} of {len(classes)} classes matched; left to the LLM: {', '.join(unmatched)}")
+print(f"Nutrition table saved to: {args.output}")
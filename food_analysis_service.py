@@ -1,19 +1,31 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import openai
+import httpx
 import json
 import modal
+import os
+import re
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
 
 # Create Modal app
 app = modal.App("food-analysis-service")
 
+# Precomputed nutrition of the detection classes, built by build_nutrition_table.py
+current_dir = os.path.dirname(os.path.abspath(__file__))
+nutrition_table_path = os.path.join(current_dir, "nutrition_table.json")
+
 # Create Modal image
 image = modal.Image.debian_slim().pip_install(
     "fastapi",
     "openai",
     "pydantic"
-)
+).add_local_file(nutrition_table_path, "/root/nutrition_table.json")
 
 # Create Modal secret
 app.secret = modal.Secret.from_name("openai-secret")
@@ -29,14 +41,283 @@ class FoodAnalysisResponse(BaseModel):
     calories: int
     glycemic_load: str
     advice: str
+    # "table" when answered from the nutrition table, "table+llm" when only the advice
+    # came from the LLM, "llm" otherwise
+    source: str = "llm"
+    glycemic_load_value: Optional[float] = None
 
-# Create FastAPI app
-web_app = FastAPI()
+class MealItem(BaseModel):
+    food_name: str
+    description: str = ""
 
-@web_app.post("/analyze-food", response_model=FoodAnalysisResponse)
-async def analyze_food(request: FoodAnalysisRequest):
+class MealAnalysisRequest(BaseModel):
+    foods: List[MealItem]
+    user_age: Optional[str] = None
+    dietary_restrictions: Optional[str] = None
+    allergies: Optional[str] = None
+
+class MealItemAnalysis(FoodAnalysisResponse):
+    food_name: str
+
+class MealAnalysisResponse(BaseModel):
+    items: List[MealItemAnalysis]
+    total_calories: int
+    # Sum of the items' glycemic loads and its category, or None and "unknown" when an
+    # item's glycemic load is unknown (those items are listed)
+    total_glycemic_load: Optional[float]
+    glycemic_load: str
+    advice: str
+    unknown_glycemic_load_items: List[str] = []
+
+def normalize_food_name(name: str) -> str:
+    return " ".join(name.replace("_", " ").lower().split())
+
+def load_nutrition_table(path: str = nutrition_table_path) -> dict:
+    """
+    Nutrition table keyed on normalized detection class name only. The dataset foods each
+    class was matched to (matched_foods) are different dishes, so they are not looked up.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        table = json.load(f)
+    return {normalize_food_name(entry["food_class"]): entry for entry in table.values()}
+
+nutrition_table = load_nutrition_table()
+
+def has_personal_context(request: FoodAnalysisRequest) -> bool:
+    return any([request.user_age, request.dietary_restrictions, request.allergies])
+
+def general_advice(food_name: str, entry: dict) -> str:
+    """Advice for a known food when there is no user context to personalize it with"""
+    category = entry["glycemic_load_category"]
+    summary = f"{food_name} has a {category} glycemic load (about {entry['glycemic_load']:.0f} per serving)."
+    if category == "low":
+        return f"{summary} It is unlikely to cause a sharp rise in blood sugar; keep portions moderate."
+    if category == "medium":
+        return f"{summary} Pair it with protein, fibre or vegetables and keep an eye on the portion size."
+    return f"{summary} Have a smaller portion, pair it with protein or vegetables, or choose a lower-GL alternative."
+
+def glycemic_load_category(glycemic_load: float) -> str:
+    """Standard cut-offs: 10 or less is low, 20 or more is high"""
+    if glycemic_load <= 10:
+        return "low"
+    if glycemic_load < 20:
+        return "medium"
+    return "high"
+
+def meal_advice(glycemic_load: float) -> str:
+    category = glycemic_load_category(glycemic_load)
+    summary = f"This meal has a {category} glycemic load (about {glycemic_load:.0f})."
+    if category == "low":
+        return f"{summary} It should keep blood sugar steady."
+    if category == "medium":
+        return f"{summary} Adding vegetables or a protein side will help blunt the blood sugar rise."
+    return f"{summary} Consider smaller portions of the starchiest items or swapping one for a lower-GL food."
+
+# Shared async OpenAI client: one bounded HTTP connection pool per container, at most
+# OPENAI_MAX_CONCURRENCY completions in flight, and a timeout on every request
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", "32"))
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", str(OPENAI_MAX_CONNECTIONS)))
+OPENAI_TIMEOUT_SECONDS = float(os.environ.get("OPENAI_TIMEOUT_SECONDS", "30"))
+
+_openai_client = None
+
+def get_openai_client() -> openai.AsyncOpenAI:
+    """The container's client, created on first use so it picks up the secret's API key"""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = openai.AsyncOpenAI(
+            timeout=OPENAI_TIMEOUT_SECONDS,
+            max_retries=1,
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_MAX_CONNECTIONS,
+                    max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+                )
+            )
+        )
+    return _openai_client
+
+# Requests beyond the limit wait here instead of queueing inside the connection pool
+llm_limiter = asyncio.Semaphore(OPENAI_MAX_CONCURRENCY)
+
+# LLM responses are cached in SQLite, in WAL mode so every worker process in the
+# container shares one cache file. Entries expire after ANALYSIS_CACHE_TTL_SECONDS and
+# the least recently used are evicted beyond ANALYSIS_CACHE_MAX_ENTRIES. Its calls block
+# on disk and the lock, so handlers run them with asyncio.to_thread, off the event loop
+ANALYSIS_CACHE_PATH = os.environ.get("ANALYSIS_CACHE_PATH", "/tmp/analysis_cache.sqlite")
+ANALYSIS_CACHE_TTL_SECONDS = float(os.environ.get("ANALYSIS_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.environ.get("ANALYSIS_CACHE_MAX_ENTRIES", "50000"))
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case and whitespace folded text, with "none"-like placeholders treated as empty"""
+    text = " ".join((text or "").casefold().split())
+    return "" if text in ("none", "n/a", "na", "not specified", "-") else text
+
+def normalize_list(text: Optional[str]) -> str:
+    """A comma, semicolon or "and" separated list as sorted, de-duplicated items"""
+    items = {normalize_text(item) for item in re.split(r",|;|\band\b", normalize_text(text))}
+    return ",".join(sorted(item for item in items if item))
+
+def cache_key(request: FoodAnalysisRequest) -> str:
+    key = {
+        "food_name": normalize_food_name(request.food_name),
+        "description": normalize_text(request.description),
+        "user_age": normalize_text(request.user_age),
+        "dietary_restrictions": normalize_list(request.dietary_restrictions),
+        "allergies": normalize_list(request.allergies)
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def meal_item_cache_key(request: FoodAnalysisRequest) -> str:
+    """Key for an item analyzed as part of a meal, whose advice is not for the food on its own"""
+    return "meal:" + cache_key(request)
+
+class ResponseCache:
+    """SQLite-backed analysis cache with TTL expiry, LRU eviction and hit counters"""
+    
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_ms = 0.0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                llm_ms REAL NOT NULL,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+    
+    def get(self, key: str) -> Optional[FoodAnalysisResponse]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, llm_ms FROM responses WHERE key = ? AND created > ?",
+                (key, now - self.ttl_seconds)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            self.saved_ms += row[1]
+        return FoodAnalysisResponse(**json.loads(row[0]))
+    
+    def put(self, key: str, response: FoodAnalysisResponse, llm_ms: float):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, response.model_dump_json(), llm_ms, now, now)
+            )
+            self._db.execute("DELETE FROM responses WHERE created <= ?", (now - self.ttl_seconds,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._db.commit()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            size = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "saved_llm_ms": round(self.saved_ms, 2),
+                "size": size
+            }
+
+response_cache = ResponseCache(ANALYSIS_CACHE_PATH, ANALYSIS_CACHE_TTL_SECONDS, ANALYSIS_CACHE_MAX_ENTRIES)
+
+class AsyncSingleFlight:
+    """
+    Per-event-loop request coalescing for coroutines: the first caller with a key starts
+    a task, and callers arriving while it runs await that task. Not thread-safe
+    """
+    
+    def __init__(self):
+        self.calls = 0
+        self.deduplicated = 0
+        self._in_flight = {}
+    
+    async def do(self, key, compute):
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(compute())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.deduplicated += 1
+        # A caller that disconnects doesn't cancel the computation the others are waiting on
+        return await asyncio.shield(task)
+    
+    def stats(self) -> dict:
+        return {"upstream_calls": self.calls, "deduplicated": self.deduplicated, "in_flight": len(self._in_flight)}
+
+analysis_flight = AsyncSingleFlight()
+
+# Foods accepted by one /analyze-meal request
+MAX_MEAL_ITEMS = int(os.environ.get("MAX_MEAL_ITEMS", "20"))
+
+async def complete_json(prompt: str, required_fields: List[str]):
+    """Run one completion through the shared client and parse its JSON object, returning (analysis, llm_ms)"""
+    start_time = time.perf_counter()
+    async with llm_limiter:
+        response = await get_openai_client().chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.7
+        )
+    llm_ms = (time.perf_counter() - start_time) * 1000
+
+    # Parse the response content as JSON
+    content = response.choices[0].message.content.strip()
     try:
-        prompt = f"""
+        analysis = json.loads(content)
+    except json.JSONDecodeError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to parse OpenAI response: {str(e)}. Response content: {content}"
+        )
+
+    # Validate required fields
+    missing_fields = [field for field in required_fields if field not in analysis]
+    if missing_fields:
+        raise HTTPException(
+            status_code=500,
+            detail=f"OpenAI response missing required fields: {missing_fields}. Response: {content}"
+        )
+    return analysis, llm_ms
+
+async def analyze_with_llm(request: FoodAnalysisRequest, entry: Optional[dict], key: str) -> FoodAnalysisResponse:
+    """Analyze one food with the LLM, pinning calories and GL to the nutrition table when it knows the food"""
+    known_values = ""
+    if entry is not None:
+        known_values = f"""
+        Known values per serving (use these exactly):
+        Calories: {entry["calories"]}
+        Glycemic load: {entry["glycemic_load_category"]} ({entry["glycemic_load"]})
+        """
+    
+    # Indented as it was inline in analyze_food, so the prompt text is unchanged
+    prompt = f"""
         Analyze the following food item and provide nutritional information:
         Food: {request.food_name}
         Description: {request.description}
@@ -45,7 +326,7 @@ async def analyze_food(request: FoodAnalysisRequest):
         Age: {request.user_age or "Not specified"}
         Dietary Restrictions: {request.dietary_restrictions or "None"}
         Allergies: {request.allergies or "None"}
-        
+        {known_values}
         Please provide:
         1. Estimated calories
         2. Glycemic load (low/medium/high)
@@ -59,47 +340,239 @@ async def analyze_food(request: FoodAnalysisRequest):
         }}
         """
 
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7
+    analysis, llm_ms = await complete_json(prompt, ["calories", "glycemic_load", "advice"])
+
+    if entry is not None:
+        result = FoodAnalysisResponse(
+            calories=entry["calories"],
+            glycemic_load=entry["glycemic_load_category"],
+            advice=analysis["advice"],
+            source="table+llm",
+            glycemic_load_value=entry["glycemic_load"]
         )
+    else:
+        result = FoodAnalysisResponse(
+            calories=analysis["calories"],
+            glycemic_load=analysis["glycemic_load"],
+            advice=analysis["advice"]
+        )
+    await asyncio.to_thread(response_cache.put, key, result, llm_ms)
+    return result
+
+def known_values_note(known: Optional[dict]) -> str:
+    if known is None:
+        return ""
+    return (f" (known per serving, use these exactly: {known['calories']} calories, "
+            f"glycemic load {known['glycemic_load_category']} ({known['glycemic_load']}))")
 
-        # Parse the response content as JSON
-        content = response.choices[0].message.content.strip()
-        try:
-            analysis = json.loads(content)
-        except json.JSONDecodeError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"Failed to parse OpenAI response: {str(e)}. Response content: {content}"
+def known_values(item: FoodAnalysisResponse) -> Optional[dict]:
+    """An already analyzed item's values, in the nutrition table's form"""
+    if item.glycemic_load_value is None:
+        return None
+    return {
+        "calories": item.calories,
+        "glycemic_load_category": item.glycemic_load,
+        "glycemic_load": item.glycemic_load_value
+    }
+
+async def analyze_meal_with_llm(request: MealAnalysisRequest, known: list, pending: list):
+    """
+    Analyze the whole meal in one completion, returning (results for the pending
+    (position, cache key) foods, meal advice). Every food is listed so the meal advice
+    covers all of it; foods with known values (the nutrition table's, or an earlier
+    answer's) keep them
+    """
+    food_list = "\n".join(
+        f"        {number}. {food.food_name}: {food.description or 'No description'}"
+        f"{known_values_note(known[position])}"
+        for number, (position, food) in enumerate(enumerate(request.foods), 1)
+    )
+    # Indented to match the single-food prompt
+    prompt = f"""
+        Analyze the following food items from one meal and provide nutritional information for each:
+{food_list}
+        
+        User Context:
+        Age: {request.user_age or "Not specified"}
+        Dietary Restrictions: {request.dietary_restrictions or "None"}
+        Allergies: {request.allergies or "None"}
+        
+        For each food, in the order listed, provide:
+        1. Estimated calories
+        2. Glycemic load (low/medium/high) and its estimated value
+        3. Short personalized advice based on user's context
+        Then give one piece of personalized advice for the meal as a whole.
+        
+        Format the response as JSON:
+        {{
+            "items": [
+                {{
+                    "calories": number,
+                    "glycemic_load": "low/medium/high",
+                    "glycemic_load_value": number,
+                    "advice": "personalized advice"
+                }}
+            ],
+            "meal_advice": "personalized advice for the meal"
+        }}
+        """
+    analysis, llm_ms = await complete_json(prompt, ["items", "meal_advice"])
+    if len(analysis["items"]) != len(request.foods):
+        raise HTTPException(
+            status_code=500,
+            detail=f"OpenAI response has {len(analysis['items'])} items for {len(request.foods)} foods"
+        )
+    
+    results = []
+    for position, key in pending:
+        item, entry = analysis["items"][position], known[position]
+        if entry is not None:
+            result = FoodAnalysisResponse(
+                calories=entry["calories"],
+                glycemic_load=entry["glycemic_load_category"],
+                advice=item["advice"],
+                source="table+llm",
+                glycemic_load_value=entry["glycemic_load"]
             )
+        else:
+            result = FoodAnalysisResponse(
+                calories=item["calories"],
+                glycemic_load=item["glycemic_load"],
+                advice=item["advice"],
+                glycemic_load_value=item.get("glycemic_load_value")
+            )
+        # Cached under the meal item key: its advice was written for this meal
+        await asyncio.to_thread(response_cache.put, key, result, llm_ms / len(pending))
+        results.append(result)
+    return results, analysis["meal_advice"]
 
-        # Validate required fields
-        required_fields = ["calories", "glycemic_load", "advice"]
-        missing_fields = [field for field in required_fields if field not in analysis]
-        if missing_fields:
-            raise HTTPException(
-                status_code=500,
-                detail=f"OpenAI response missing required fields: {missing_fields}. Response: {content}"
+# Create FastAPI app
+web_app = FastAPI()
+
+@web_app.post("/analyze-food", response_model=FoodAnalysisResponse)
+async def analyze_food(request: FoodAnalysisRequest):
+    try:
+        # Known foods are answered from the nutrition table; the LLM is only needed for
+        # unknown foods or advice personalized to the user's context
+        entry = nutrition_table.get(normalize_food_name(request.food_name))
+        if entry is not None and not has_personal_context(request):
+            return FoodAnalysisResponse(
+                calories=entry["calories"],
+                glycemic_load=entry["glycemic_load_category"],
+                advice=general_advice(request.food_name.replace("_", " "), entry),
+                source="table",
+                glycemic_load_value=entry["glycemic_load"]
             )
+        
+        # Same food and context as an earlier request
+        key = cache_key(request)
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            return cached
+        
+        # Identical requests already waiting on the LLM share its answer
+        return await analysis_flight.do(key, lambda: analyze_with_llm(request, entry, key))
 
-        return FoodAnalysisResponse(
-            calories=analysis["calories"],
-            glycemic_load=analysis["glycemic_load"],
-            advice=analysis["advice"]
+    except HTTPException:
+        raise
+    except openai.APITimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"OpenAI request timed out after {OPENAI_TIMEOUT_SECONDS} seconds"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error analyzing food: {str(e)}"
+        )
+
+@web_app.post("/analyze-meal", response_model=MealAnalysisResponse)
+async def analyze_meal(request: MealAnalysisRequest):
+    if not request.foods:
+        raise HTTPException(status_code=400, detail="No foods to analyze")
+    if len(request.foods) > MAX_MEAL_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many foods. Maximum is {MAX_MEAL_ITEMS} per meal"
+        )
+    try:
+        items = [None] * len(request.foods)
+        known = [None] * len(request.foods)  # Values the LLM must keep, by position
+        keys = []
+        pending = []  # (position, cache key) of foods for the LLM
+        
+        # Known foods from the nutrition table, then earlier answers from the response cache.
+        # As in /analyze-food, advice for known foods is only personalized by the LLM when
+        # there is user context
+        personal = has_personal_context(request)
+        for position, food in enumerate(request.foods):
+            key = meal_item_cache_key(FoodAnalysisRequest(
+                food_name=food.food_name,
+                description=food.description,
+                user_age=request.user_age,
+                dietary_restrictions=request.dietary_restrictions,
+                allergies=request.allergies
+            ))
+            keys.append(key)
+            entry = nutrition_table.get(normalize_food_name(food.food_name))
+            known[position] = entry
+            if entry is not None and not personal:
+                items[position] = MealItemAnalysis(
+                    food_name=food.food_name,
+                    calories=entry["calories"],
+                    glycemic_load=entry["glycemic_load_category"],
+                    advice=general_advice(food.food_name.replace("_", " "), entry),
+                    source="table",
+                    glycemic_load_value=entry["glycemic_load"]
+                )
+                continue
+            cached = await asyncio.to_thread(response_cache.get, key)
+            # The meal total needs a glycemic load value, which an answer may lack
+            if cached is not None and cached.glycemic_load_value is not None:
+                items[position] = MealItemAnalysis(food_name=food.food_name, **cached.model_dump())
+                known[position] = known_values(cached)
+            else:
+                pending.append((position, key))
+        
+        # Everything else in one completion, with the user context sent once. Without
+        # pending foods there is no completion and the meal advice comes from the total
+        advice = None
+        if pending:
+            # Identical meals already waiting on the LLM share its answer
+            meal_key = ("meal",) + tuple(keys)
+            results, advice = await analysis_flight.do(meal_key, lambda: analyze_meal_with_llm(request, known, pending))
+            for (position, _), result in zip(pending, results):
+                items[position] = MealItemAnalysis(food_name=request.foods[position].food_name, **result.model_dump())
+        
+        # Items without a glycemic load value make the total unknown rather than understated
+        unknown = [item.food_name for item in items if item.glycemic_load_value is None]
+        total_glycemic_load = None if unknown else round(sum(item.glycemic_load_value for item in items), 1)
+        return MealAnalysisResponse(
+            items=items,
+            total_calories=sum(item.calories for item in items),
+            total_glycemic_load=total_glycemic_load,
+            glycemic_load="unknown" if unknown else glycemic_load_category(total_glycemic_load),
+            advice=advice or meal_advice(total_glycemic_load),
+            unknown_glycemic_load_items=unknown
         )
 
     except HTTPException:
         raise
+    except openai.APITimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"OpenAI request timed out after {OPENAI_TIMEOUT_SECONDS} seconds"
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Error analyzing food: {str(e)}"
+            detail=f"Error analyzing meal: {str(e)}"
         )
 
+@web_app.get("/metrics")
+async def metrics():
+    return {"response_cache": await asyncio.to_thread(response_cache.stats), "singleflight": analysis_flight.stats()}
+
 # Create Modal function
 @app.function(image=image, secrets=[app.secret])
 @modal.asgi_app()
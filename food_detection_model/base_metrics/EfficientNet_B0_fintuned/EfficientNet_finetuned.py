@@ -214,7 +214,8 @@ model.save(f"{FINE_TUNE_DIR}/EfficientNet_finetuned.keras")
 converter = tf.lite.TFLiteConverter.from_keras_model(model)
 
 
-converter.optimizations = [tf.lite.Optimize.DEFAULT]  # Activates float16 quantization
+# Dynamic-range quantization; quantize_model.py also exports float16 and full-integer INT8 variants
+converter.optimizations = [tf.lite.Optimize.DEFAULT]
 converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS]  # Ensures CPU fallback
 converter.experimental_new_converter = True  # Better conversion
 
@@ -0,0 +1,128 @@
+import tensorflow as tf
+from tensorflow.keras.applications import MobileNetV3Small
+import matplotlib.pyplot as plt
+import pandas as pd
+import os
+from datetime import datetime
+from sklearn.metrics import classification_report
+from preprocessed import train_data, val_data, test_data, class_names
+
+# Small, fast first stage for the detection service's cascade. It only has to be
+# right when it is confident; everything else is escalated to EfficientNet.
+
+IMAGE_SIZE = (224, 224)
+SERVICE_IMAGE_SIZE = (300, 300)  # Input size of the detection service
+RESULTS_DIR = "mobilenetv3_small_results"
+os.makedirs(RESULTS_DIR, exist_ok=True)
+
+# MobileNetV3Small rescales raw 0-255 pixels itself (include_preprocessing=True)
+base_model = MobileNetV3Small(
+    weights='imagenet',
+    include_top=False,
+    input_shape=(*IMAGE_SIZE, 3),
+    minimalistic=True
+)
+
+# Freeze all layers
+base_model.trainable = False
+
+# Custom classification head
+x = tf.keras.layers.GlobalAveragePooling2D()(base_model.output)
+x = tf.keras.layers.Dropout(0.2)(x)
+predictions = tf.keras.layers.Dense(len(class_names), activation='softmax')(x)
+model = tf.keras.Model(inputs=base_model.input, outputs=predictions)
+
+model.compile(
+    optimizer=tf.keras.optimizers.Adam(learning_rate=1e-3),
+    loss='categorical_crossentropy',
+    metrics=['accuracy']
+)
+
+# Callbacks
+callbacks = [
+    tf.keras.callbacks.EarlyStopping(patience=5, restore_best_weights=True),
+    tf.keras.callbacks.ModelCheckpoint(
+        f"{RESULTS_DIR}/best_model.keras",
+        save_best_only=True,
+        monitor='val_accuracy'
+    ),
+    tf.keras.callbacks.ReduceLROnPlateau(
+        monitor='val_loss',
+        factor=0.1,
+        patience=3
+    )
+]
+
+# Training
+history = model.fit(
+    train_data,
+    validation_data=val_data,
+    epochs=20,
+    callbacks=callbacks,
+    verbose=1
+)
+
+# Evaluation
+y_true, y_pred = [], []
+for images, labels in test_data:
+    y_true.extend(tf.argmax(labels, axis=1).numpy())
+    y_pred.extend(tf.argmax(model.predict(images, verbose=0), axis=1))
+
+report = classification_report(y_true, y_pred, target_names=class_names, output_dict=True)
+pd.DataFrame(report).transpose().to_csv(f"{RESULTS_DIR}/classification_report.csv")
+
+def plot_history(history):
+    plt.figure(figsize=(12, 4))
+
+    plt.subplot(1, 2, 1)
+    plt.plot(history.history['accuracy'], label='Train Accuracy')
+    plt.plot(history.history['val_accuracy'], label='Validation Accuracy')
+    plt.title('Model Accuracy')
+    plt.ylabel('Accuracy')
+    plt.xlabel('Epoch')
+    plt.legend()
+
+    plt.subplot(1, 2, 2)
+    plt.plot(history.history['loss'], label='Train Loss')
+    plt.plot(history.history['val_loss'], label='Validation Loss')
+    plt.title('Model Loss')
+    plt.ylabel('Loss')
+    plt.xlabel('Epoch')
+    plt.legend()
+
+    plt.tight_layout()
+    plt.savefig(f"{RESULTS_DIR}/training_history.png")
+    plt.close()
+
+plot_history(history)
+
+metrics = {
+    'training_accuracy': history.history['accuracy'][-1],
+    'validation_accuracy': history.history['val_accuracy'][-1],
+    'test_accuracy': report['accuracy'],
+    'average_precision': report['macro avg']['precision'],
+    'average_recall': report['macro avg']['recall'],
+    'average_f1': report['macro avg']['f1-score'],
+    'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+}
+pd.DataFrame([metrics]).to_csv(f"{RESULTS_DIR}/mobilenetv3_small_metrics.csv", index=False)
+
+model.save(f"{RESULTS_DIR}/mobilenetv3_small_model.keras")
+
+# Export for the cascade: accept the service's 300x300 input and resize inside the graph,
+# so both cascade stages share one preprocessed image
+service_input = tf.keras.Input(shape=(*SERVICE_IMAGE_SIZE, 3))
+service_output = model(tf.keras.layers.Resizing(*IMAGE_SIZE)(service_input))
+service_model = tf.keras.Model(inputs=service_input, outputs=service_output)
+
+converter = tf.lite.TFLiteConverter.from_keras_model(service_model)
+converter.optimizations = [tf.lite.Optimize.DEFAULT]
+with open(f"{RESULTS_DIR}/cascade_model.tflite", "wb") as f:
+    f.write(converter.convert())
+
+print("\nModel evaluation results saved in 'mobilenetv3_small_results' directory:")
+print(f"- classification_report.csv: Detailed class-wise metrics")
+print(f"- training_history.png: Accuracy and loss curves")
+print(f"- mobilenetv3_small_metrics.csv: Key performance metrics")
+print(f"- mobilenetv3_small_model.keras: Saved model weights")
+print(f"- cascade_model.tflite: Copy to food_detection_model/ to enable the cascade")
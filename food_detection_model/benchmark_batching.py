@@ -0,0 +1,69 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from food_detection_service import InterpreterPool, MicroBatcher, preprocess_image
+
+# Benchmark the micro-batching window against throughput and latency.
+# Usage: python benchmark_batching.py --model best_model.tflite
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+test_images_dir = os.path.join(current_dir, "Finetuned model", "test_images")
+
+parser = argparse.ArgumentParser(description="Micro-batching throughput benchmark")
+parser.add_argument("--model", default=os.path.join(current_dir, "best_model.tflite"))
+parser.add_argument("--windows", default="0,5,10,20", help="Comma-separated batch windows in ms")
+parser.add_argument("--max-batch-size", type=int, default=8)
+parser.add_argument("--requests", type=int, default=256)
+parser.add_argument("--concurrency", type=int, default=32)
+parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+args = parser.parse_args()
+
+# Preprocess the test images once so only batching and inference are timed
+images = []
+for file_name in sorted(os.listdir(test_images_dir)):
+    with Image.open(os.path.join(test_images_dir, file_name)) as img:
+        images.append(preprocess_image(img))
+print(f"Loaded {len(images)} test images")
+
+pool = InterpreterPool(args.workers, model_path=args.model)
+
+results = []
+for window_ms in [float(w) for w in args.windows.split(",")]:
+    batcher = MicroBatcher(pool, window_ms=window_ms, max_batch_size=args.max_batch_size)
+
+    # Warm up the batch shapes before timing
+    for future in [batcher.submit(images[i % len(images)]) for i in range(args.max_batch_size)]:
+        future.result()
+
+    def timed_request(i):
+        start_time = time.perf_counter()
+        batcher.submit(images[i % len(images)]).result()
+        return time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as clients:
+        latencies = np.array(list(clients.map(timed_request, range(args.requests))))
+    elapsed = time.perf_counter() - start_time
+    batcher.close()
+
+    images_per_sec = args.requests / elapsed
+    results.append({
+        'window_ms': window_ms,
+        'max_batch_size': args.max_batch_size,
+        'images_per_sec': round(images_per_sec, 2),
+        'images_per_sec_per_core': round(images_per_sec / args.workers, 2),
+        'p50_latency_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 2)
+    })
+    print(results[-1])
+
+# Save results
+os.makedirs(os.path.join(current_dir, "benchmark_results"), exist_ok=True)
+csv_path = os.path.join(current_dir, "benchmark_results", "batching_benchmark.csv")
+pd.DataFrame(results).to_csv(csv_path, index=False)
+print(f"\nBenchmark results saved to: {csv_path}")
+print(pd.DataFrame(results).to_string(index=False))
@@ -0,0 +1,100 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from PIL import Image
+from concurrent.futures import ThreadPoolExecutor
+from food_detection_service import InterpreterPool, preprocess_image, run_batch
+
+# Benchmark interpreter threading on this host: several single-threaded interpreters
+# against fewer multi-threaded ones, across batch sizes, with XNNPACK on and off.
+# Each configuration is loaded with one client per interpreter, so every interpreter
+# stays busy. Use the recommendation to set NUM_INTERPRETERS, INTERPRETER_THREADS and
+# USE_XNNPACK and to size the container's CPU count.
+# Usage: python benchmark_interpreters.py --model best_model.tflite --p99-slo-ms 250
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+test_images_dir = os.path.join(current_dir, "Finetuned model", "test_images")
+cpu_count = os.cpu_count() or 1
+
+parser = argparse.ArgumentParser(description="Interpreter threading and XNNPACK benchmark")
+parser.add_argument("--model", default=os.path.join(current_dir, "best_model.tflite"))
+parser.add_argument("--cores", type=int, default=cpu_count, help="Cores to divide between interpreters")
+parser.add_argument("--threads", default="1,2,4", help="Comma-separated intra-op thread counts per interpreter")
+parser.add_argument("--batch-sizes", default="1,4,8", help="Comma-separated batch sizes")
+parser.add_argument("--xnnpack", default="1,0", help="Comma-separated XNNPACK settings (1 on, 0 off)")
+parser.add_argument("--requests", type=int, default=64, help="Batches run per configuration")
+parser.add_argument("--p99-slo-ms", type=float, default=None, help="p99 batch latency budget for the recommendation")
+args = parser.parse_args()
+
+# Preprocess the test images once so only inference is timed
+images = []
+for file_name in sorted(os.listdir(test_images_dir)):
+    with Image.open(os.path.join(test_images_dir, file_name)) as img:
+        images.append(preprocess_image(img))
+print(f"Loaded {len(images)} test images")
+
+def make_batch(batch_size):
+    return np.stack([images[i % len(images)] for i in range(batch_size)])
+
+results = []
+for use_xnnpack in [w == "1" for w in args.xnnpack.split(",")]:
+    for threads in [int(t) for t in args.threads.split(",")]:
+        if threads > args.cores:
+            continue
+        num_interpreters = args.cores // threads
+        pool = InterpreterPool(num_interpreters, model_path=args.model, num_threads=threads, use_xnnpack=use_xnnpack)
+
+        for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+            batch = make_batch(batch_size)
+
+            def timed_request(_):
+                with pool.acquire() as interpreter:
+                    start_time = time.perf_counter()
+                    run_batch(interpreter, batch)
+                    return time.perf_counter() - start_time
+
+            # Warm up every interpreter at this batch shape before timing
+            with ThreadPoolExecutor(max_workers=num_interpreters) as clients:
+                list(clients.map(timed_request, range(num_interpreters)))
+
+            start_time = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=num_interpreters) as clients:
+                latencies = np.array(list(clients.map(timed_request, range(args.requests))))
+            elapsed = time.perf_counter() - start_time
+
+            images_per_sec = args.requests * batch_size / elapsed
+            results.append({
+                'xnnpack': use_xnnpack,
+                'interpreters': num_interpreters,
+                'threads_per_interpreter': threads,
+                'batch_size': batch_size,
+                'images_per_sec': round(images_per_sec, 2),
+                'images_per_sec_per_core': round(images_per_sec / (num_interpreters * threads), 2),
+                'p50_latency_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+                'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 2),
+                'p99_latency_ms': round(float(np.percentile(latencies, 99)) * 1000, 2)
+            })
+            print(results[-1])
+
+# Save results
+results = pd.DataFrame(results)
+os.makedirs(os.path.join(current_dir, "benchmark_results"), exist_ok=True)
+csv_path = os.path.join(current_dir, "benchmark_results", "interpreter_benchmark.csv")
+results.to_csv(csv_path, index=False)
+print(f"\nBenchmark results saved to: {csv_path}")
+print(results.to_string(index=False))
+
+# Recommendation: highest throughput within the latency budget
+candidates = results
+if args.p99_slo_ms is not None:
+    candidates = results[results['p99_latency_ms'] <= args.p99_slo_ms]
+if candidates.empty:
+    print(f"\nNo configuration meets a p99 of {args.p99_slo_ms} ms on {args.cores} cores")
+else:
+    best = candidates.sort_values('images_per_sec', ascending=False).iloc[0]
+    print(f"\nRecommended for {args.cores} cores: {best['images_per_sec']} images/sec, "
+          f"p99 {best['p99_latency_ms']} ms")
+    print(f"  NUM_INTERPRETERS={best['interpreters']} INTERPRETER_THREADS={best['threads_per_interpreter']} "
+          f"USE_XNNPACK={int(best['xnnpack'])} MAX_BATCH_SIZE={best['batch_size']}")
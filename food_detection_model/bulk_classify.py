@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import zipfile
+import argparse
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from food_detection_service import (
+    PREPROCESSING, create_interpreter, decode_image, preprocess_image, run_batch, to_probabilities, top_k
+)
+
+# Offline bulk classification of a photo archive (a directory tree or a .zip file).
+# Worker processes decode and preprocess upcoming images while the main process runs
+# large batches through the TFLite interpreter. Results are appended to the output as
+# they are produced, so an interrupted run resumes where it stopped. Images that failed
+# to decode are recorded with an error and skipped on resume unless --retry-errors is given.
+# Usage: python bulk_classify.py photos.zip --output labels.jsonl
+#        python bulk_classify.py photos/ --output labels_parquet/ --format parquet
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.bmp')
+
+# Every record, classification or decode error, carries these fields (null when not
+# applicable), so JSONL lines and Parquet parts all share one schema
+RECORD_FIELDS = ("image", "food", "confidence", "top_k", "model_version", "error")
+
+def make_record(**fields) -> dict:
+    return {field: fields.get(field) for field in RECORD_FIELDS}
+
+def list_images(source: str) -> list:
+    """Image paths (or zip member names) under source, in a stable order"""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            names = archive.namelist()
+    else:
+        names = [
+            os.path.relpath(os.path.join(root, file_name), source)
+            for root, _, files in os.walk(source)
+            for file_name in files
+        ]
+    return sorted(name for name in names if name.lower().endswith(IMAGE_EXTENSIONS))
+
+# Each decode worker process keeps its own handle on the zip archive
+_archives = {}
+
+def read_image(source: str, name: str) -> bytes:
+    if zipfile.is_zipfile(source):
+        if source not in _archives:
+            _archives[source] = zipfile.ZipFile(source)
+        return _archives[source].read(name)
+    with open(os.path.join(source, name), "rb") as f:
+        return f.read()
+
+def decode_chunk(source: str, names: list, input_size, preprocessing: str):
+    """Decode and preprocess one chunk of images in a worker process"""
+    decoded_names, arrays, errors = [], [], []
+    for name in names:
+        try:
+            image = decode_image(read_image(source, name), input_size)
+            arrays.append(preprocess_image(image, input_size=input_size, preprocessing=preprocessing))
+            decoded_names.append(name)
+        except Exception as e:
+            errors.append((name, str(e)))
+    images = np.stack(arrays) if arrays else None
+    return decoded_names, images, errors
+
+class JsonlWriter:
+    """Appends one JSON record per line, flushed after each batch"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def done(self, retry_errors: bool = False) -> set:
+        """Images already written, dropping a line left incomplete by an interrupted run"""
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            complete = data.rfind(b"\n") + 1
+            if complete < len(data):
+                print(f"Discarding incomplete last line of {self.path}")
+                f.truncate(complete)
+        records = [json.loads(line) for line in data[:complete].splitlines() if line.strip()]
+        return {record["image"] for record in records if not (retry_errors and record.get("error"))}
+
+    def write(self, records: list):
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+class ParquetWriter:
+    """Writes each batch as a new part file in the output directory"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def _parts(self) -> list:
+        return sorted(file_name for file_name in os.listdir(self.path) if file_name.endswith(".parquet"))
+
+    def done(self, retry_errors: bool = False) -> set:
+        import pandas as pd
+        images = set()
+        for part in self._parts():
+            records = pd.read_parquet(os.path.join(self.path, part), columns=["image", "error"])
+            if retry_errors:
+                records = records[records["error"].isna()]
+            images.update(records["image"])
+        return images
+
+    def write(self, records: list):
+        import pandas as pd
+        import pyarrow as pa
+        # top_k is stored as a JSON string so every part has the same flat schema, and the
+        # schema is explicit so parts holding only errors don't get null-typed columns
+        schema = pa.schema([
+            ("image", pa.string()),
+            ("food", pa.string()),
+            ("confidence", pa.float64()),
+            ("top_k", pa.string()),
+            ("model_version", pa.string()),
+            ("error", pa.string())
+        ])
+        rows = [{**record, "top_k": json.dumps(record["top_k"]) if record["top_k"] is not None else None}
+                for record in records]
+        part_path = os.path.join(self.path, f"part-{len(self._parts()):06d}.parquet")
+        pd.DataFrame(rows, columns=list(RECORD_FIELDS)).to_parquet(part_path, index=False, schema=schema)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk offline food image classification")
+    parser.add_argument("source", help="Directory of images or a .zip archive")
+    parser.add_argument("--output", required=True, help="JSONL file, or directory of Parquet parts")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--model", default=os.path.join(current_dir, "best_model.tflite"))
+    parser.add_argument("--manifest", default=os.path.join(current_dir, "model_manifest.json"))
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--decode-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads", type=int, default=None, help="Interpreter threads (default: TFLite's)")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Images decoded per worker task")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="Retry images an earlier run recorded as failed to decode")
+    args = parser.parse_args()
+
+    with open(args.manifest) as f:
+        manifest = json.load(f)
+    classes = manifest["classes"]
+    _, height, width, _ = manifest["input_shape"]
+    input_size = (width, height)
+    if manifest["preprocessing"] not in PREPROCESSING:
+        raise ValueError(f"Unknown preprocessing: {manifest['preprocessing']}")
+
+    writer = JsonlWriter(args.output) if args.format == "jsonl" else ParquetWriter(args.output)
+
+    # Resume from whatever an earlier run already wrote
+    done = writer.done(retry_errors=args.retry_errors)
+    names = [name for name in list_images(args.source) if name not in done]
+    print(f"{len(done)} images already classified, {len(names)} to go")
+
+    interpreter = create_interpreter(num_threads=args.threads, model_path=args.model)
+    chunks = [names[i:i + args.chunk_size] for i in range(0, len(names), args.chunk_size)]
+
+    # Enough decode work in flight to fill the next batch while this one runs inference,
+    # without buffering the whole archive in memory
+    max_in_flight = max(args.decode_workers * 2, args.batch_size // args.chunk_size + 1)
+
+    start_time = time.perf_counter()
+    processed = 0
+    with ProcessPoolExecutor(max_workers=args.decode_workers) as decoders:
+        pending = deque()
+        next_chunk = 0
+        batch_names, batch_arrays = [], []
+
+        def flush():
+            nonlocal processed, batch_names, batch_arrays
+            if not batch_names:
+                return
+            output = run_batch(interpreter, np.concatenate(batch_arrays))
+            probabilities = to_probabilities(output, manifest.get("outputs", "probabilities"))
+            records = []
+            for name, probs, indices in zip(batch_names, probabilities, top_k(probabilities)):
+                records.append(make_record(
+                    image=name,
+                    food=classes[int(indices[0])],
+                    confidence=float(probs[indices[0]]),
+                    top_k=[{"food": classes[int(i)], "confidence": float(probs[i])} for i in indices],
+                    model_version=manifest["version"]
+                ))
+            writer.write(records)
+            processed += len(batch_names)
+            batch_names, batch_arrays = [], []
+            elapsed = time.perf_counter() - start_time
+            print(f"Classified {processed}/{len(names)} images ({processed / elapsed:.1f} images/sec)")
+
+        while next_chunk < len(chunks) or pending:
+            while next_chunk < len(chunks) and len(pending) < max_in_flight:
+                pending.append(decoders.submit(
+                    decode_chunk, args.source, chunks[next_chunk], input_size, manifest["preprocessing"]
+                ))
+                next_chunk += 1
+
+            decoded_names, images, errors = pending.popleft().result()
+            if errors:
+                writer.write([
+                    make_record(image=name, model_version=manifest["version"], error=error)
+                    for name, error in errors
+                ])
+            if images is not None:
+                batch_names.extend(decoded_names)
+                batch_arrays.append(images)
+            if len(batch_names) >= args.batch_size:
+                flush()
+        flush()
+
+    elapsed = time.perf_counter() - start_time
+    if processed:
+        print(f"\nDone: {processed} images in {elapsed:.1f}s ({processed / elapsed:.1f} images/sec "
+              f"with {args.decode_workers} decode workers)")
+
+if __name__ == "__main__":
+    main()
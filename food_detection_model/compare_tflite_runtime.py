@@ -0,0 +1,105 @@
+import os
+import sys
+import argparse
+import subprocess
+import numpy as np
+from PIL import Image
+from food_detection_service import MODEL_OUTPUTS, preprocess_image, to_probabilities
+
+# Check that the TensorFlow-free inference path matches the TensorFlow path, and
+# measure how much import and cold-start time dropping TensorFlow saves.
+# Usage: python compare_tflite_runtime.py --model best_model.tflite
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+test_images_dir = os.path.join(current_dir, "Finetuned model", "test_images")
+
+parser = argparse.ArgumentParser(description="tflite-runtime vs TensorFlow parity and cold-start comparison")
+parser.add_argument("--model", default=os.path.join(current_dir, "best_model.tflite"))
+parser.add_argument("--model-outputs", default="probabilities", choices=MODEL_OUTPUTS,
+                    help="Whether the model's head already applies softmax")
+parser.add_argument("--runs", type=int, default=5, help="Cold-start runs per backend")
+args = parser.parse_args()
+
+def tf_preprocess_image(image):
+    """The original TensorFlow preprocessing path"""
+    import tensorflow as tf
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    image = image.resize((300, 300))
+    image_array = np.array(image, dtype=np.float32)
+    image_array = tf.keras.applications.efficientnet.preprocess_input(image_array)
+    return image_array.astype(np.float32)
+
+def predict(interpreter, image_array):
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
+    interpreter.set_tensor(input_details['index'], image_array[np.newaxis])
+    interpreter.invoke()
+    return to_probabilities(interpreter.get_tensor(output_details['index'])[0], args.model_outputs)
+
+# Preprocessing parity
+print("Checking preprocessing parity...")
+images = []
+max_pixel_diff = 0.0
+for file_name in sorted(os.listdir(test_images_dir)):
+    with Image.open(os.path.join(test_images_dir, file_name)) as img:
+        numpy_array = preprocess_image(img)
+        tf_array = tf_preprocess_image(img)
+    max_pixel_diff = max(max_pixel_diff, float(np.max(np.abs(numpy_array - tf_array))))
+    images.append((file_name, numpy_array, tf_array))
+print(f"Max pixel difference over {len(images)} images: {max_pixel_diff}")
+assert max_pixel_diff == 0.0, "NumPy preprocessing does not match TensorFlow"
+
+# Prediction parity
+print("\nChecking prediction parity...")
+import tensorflow as tf
+tf_interpreter = tf.lite.Interpreter(model_path=args.model)
+tf_interpreter.allocate_tensors()
+try:
+    from tflite_runtime.interpreter import Interpreter
+    runtime_interpreter = Interpreter(model_path=args.model)
+    runtime_interpreter.allocate_tensors()
+except ImportError:
+    print("tflite_runtime is not installed; comparing NumPy preprocessing on the TensorFlow interpreter only")
+    runtime_interpreter = tf_interpreter
+
+max_prob_diff = 0.0
+for file_name, numpy_array, tf_array in images:
+    runtime_probs = predict(runtime_interpreter, numpy_array)
+    tf_probs = predict(tf_interpreter, tf_array)
+    max_prob_diff = max(max_prob_diff, float(np.max(np.abs(runtime_probs - tf_probs))))
+    assert np.argmax(runtime_probs) == np.argmax(tf_probs), f"Top-1 mismatch for {file_name}"
+print(f"Top-1 predictions match; max probability difference: {max_prob_diff:.2e}")
+
+# Import and cold-start comparison, each run in a fresh interpreter process
+COLD_START = """
+import time
+start_time = time.perf_counter()
+{import_line}
+import_seconds = time.perf_counter() - start_time
+interpreter = Interpreter(model_path={model_path!r})
+interpreter.allocate_tensors()
+print(import_seconds, time.perf_counter() - start_time)
+"""
+
+backends = {
+    "tensorflow": "import tensorflow as tf; Interpreter = tf.lite.Interpreter",
+    "tflite_runtime": "from tflite_runtime.interpreter import Interpreter",
+}
+
+print("\nMeasuring cold starts...")
+for backend, import_line in backends.items():
+    timings = []
+    for _ in range(args.runs):
+        result = subprocess.run(
+            [sys.executable, "-c", COLD_START.format(import_line=import_line, model_path=args.model)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            break
+        timings.append([float(value) for value in result.stdout.split()[-2:]])
+    if not timings:
+        print(f"{backend}: not installed")
+        continue
+    import_seconds, cold_start_seconds = np.median(np.array(timings), axis=0)
+    print(f"{backend}: import {import_seconds:.2f}s, import + interpreter ready {cold_start_seconds:.2f}s (median of {len(timings)})")
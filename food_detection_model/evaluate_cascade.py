@@ -0,0 +1,102 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from food_detection_service import (
+    FOOD_CLASSES, InterpreterPool, classify_batch, classify_on, decode_image, preprocess_image
+)
+
+# Calibrate the cascade threshold on the validation split, then compare the cascade
+# against EfficientNet alone on the test split.
+# Usage: python evaluate_cascade.py --cascade-model cascade_model.tflite --val-dir <val> --test-dir <test>
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="Cascade classifier calibration and report")
+parser.add_argument("--model", default=os.path.join(current_dir, "best_model.tflite"))
+parser.add_argument("--cascade-model", default=os.path.join(current_dir, "cascade_model.tflite"))
+parser.add_argument("--model-outputs", default="probabilities", choices=["probabilities", "logits"],
+                    help="Whether the model's head already applies softmax")
+parser.add_argument("--cascade-outputs", default="probabilities", choices=["probabilities", "logits"],
+                    help="Whether the cascade model's head already applies softmax")
+parser.add_argument("--val-dir", required=True, help="Validation split, used to calibrate the threshold")
+parser.add_argument("--test-dir", required=True, help="Test split, used for the report")
+parser.add_argument("--max-accuracy-drop", type=float, default=0.01,
+                    help="Largest validation accuracy loss allowed against EfficientNet alone")
+parser.add_argument("--output-dir", default=os.path.join(current_dir, "cascade_results"))
+args = parser.parse_args()
+
+class_indices = {name: index for index, name in FOOD_CLASSES.items()}
+
+def load_split(split_dir):
+    """Preprocess every image of a class-per-folder split the same way the service does"""
+    images, labels = [], []
+    for class_name in sorted(os.listdir(split_dir)):
+        class_dir = os.path.join(split_dir, class_name)
+        for file_name in sorted(os.listdir(class_dir)):
+            with open(os.path.join(class_dir, file_name), "rb") as f:
+                images.append(preprocess_image(decode_image(f.read())))
+            labels.append(class_indices[class_name])
+    return np.stack(images), np.array(labels)
+
+# Single-threaded interpreters, to match one interpreter per core in the service
+model_pool = InterpreterPool(1, model_path=args.model, outputs=args.model_outputs)
+cascade_pool = InterpreterPool(1, model_path=args.cascade_model, outputs=args.cascade_outputs)
+
+# Calibration
+print("Calibrating threshold on validation split...")
+val_images, val_labels = load_split(args.val_dir)
+model_probs = np.concatenate([classify_on(model_pool, val_images[i:i + 1]) for i in range(len(val_images))])
+cascade_probs = np.concatenate([classify_on(cascade_pool, val_images[i:i + 1]) for i in range(len(val_images))])
+model_accuracy = float(np.mean(np.argmax(model_probs, axis=1) == val_labels))
+
+sweep = []
+for threshold in np.round(np.arange(0.1, 1.0, 0.025), 3).tolist() + [0.99, 0.995]:
+    escalate = np.max(cascade_probs, axis=1) < threshold
+    predictions = np.where(escalate, np.argmax(model_probs, axis=1), np.argmax(cascade_probs, axis=1))
+    sweep.append({
+        'threshold': threshold,
+        'escalation_rate': round(float(np.mean(escalate)), 4),
+        'cascade_accuracy': round(float(np.mean(predictions == val_labels)), 4),
+        'efficientnet_accuracy': round(model_accuracy, 4)
+    })
+sweep = pd.DataFrame(sweep)
+
+# Lowest threshold (fewest escalations) that keeps accuracy within the allowed drop
+acceptable = sweep[sweep['cascade_accuracy'] >= model_accuracy - args.max_accuracy_drop]
+threshold = float(acceptable['threshold'].min()) if not acceptable.empty else 1.0
+print(f"Calibrated threshold: {threshold} (EfficientNet validation accuracy {model_accuracy:.4f})")
+
+# Report
+print("\nEvaluating on test split...")
+test_images, test_labels = load_split(args.test_dir)
+
+def evaluate(name, **cascade):
+    predictions, latencies = [], []
+    for i in range(len(test_images)):
+        start_time = time.perf_counter()
+        result = classify_batch(model_pool, test_images[i:i + 1], **cascade)[0]
+        latencies.append(time.perf_counter() - start_time)
+        predictions.append(int(result["top_k"][0]))
+    return {
+        'pipeline': name,
+        'accuracy': round(float(np.mean(np.array(predictions) == test_labels)), 4),
+        'mean_latency_ms': round(float(np.mean(latencies)) * 1000, 2),
+        'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 2)
+    }
+
+efficientnet = evaluate("efficientnet")
+cascade = evaluate(f"cascade (threshold {threshold})", cascade_pool=cascade_pool, threshold=threshold)
+escalate = np.concatenate([classify_on(cascade_pool, test_images[i:i + 1]) for i in range(len(test_images))]).max(axis=1) < threshold
+efficientnet['escalation_rate'] = 1.0
+cascade['escalation_rate'] = round(float(np.mean(escalate)), 4)
+report = pd.DataFrame([efficientnet, cascade])
+
+# Save results
+os.makedirs(args.output_dir, exist_ok=True)
+sweep.to_csv(os.path.join(args.output_dir, "threshold_sweep.csv"), index=False)
+report.to_csv(os.path.join(args.output_dir, "cascade_report.csv"), index=False)
+print(report.to_string(index=False))
+print(f"\nResults saved in '{args.output_dir}'. Deploy with CASCADE_THRESHOLD={threshold} "
+      f"CASCADE_MODEL_OUTPUTS={args.cascade_outputs}")
@@ -0,0 +1,94 @@
+import os
+import random
+import argparse
+import numpy as np
+import pandas as pd
+from PIL import Image
+from food_detection_service import (
+    FOOD_CLASSES, INPUT_SIZE, InterpreterPool, classify_on, merge_views, preprocess_image, tile_views
+)
+
+# Check multi-food detection on synthetic plates: two test images of different classes
+# side by side, plus the single images themselves. Sweeps MULTI_FOOD_THRESHOLD for how
+# often both foods of a plate are found against how often a single food yields extras.
+# Usage: python evaluate_plate.py --test-dir <test>
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="Multi-food plate detection check")
+parser.add_argument("--model", default=os.path.join(current_dir, "best_model.tflite"))
+parser.add_argument("--model-outputs", default="probabilities", choices=["probabilities", "logits"],
+                    help="Whether the model's head already applies softmax")
+parser.add_argument("--test-dir", required=True, help="Class-per-folder split to build plates from")
+parser.add_argument("--plates", type=int, default=200)
+parser.add_argument("--max-extra-rate", type=float, default=0.1,
+                    help="Largest share of single-food images allowed to report more than one food")
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--output-dir", default=os.path.join(current_dir, "plate_results"))
+args = parser.parse_args()
+
+class_indices = {name: index for index, name in FOOD_CLASSES.items()}
+rng = random.Random(args.seed)
+pool = InterpreterPool(1, model_path=args.model, outputs=args.model_outputs)
+
+images_by_class = {}
+for class_name in sorted(os.listdir(args.test_dir)):
+    class_dir = os.path.join(args.test_dir, class_name)
+    images_by_class[class_indices[class_name]] = [
+        os.path.join(class_dir, file_name) for file_name in sorted(os.listdir(class_dir))
+    ]
+
+def load(path):
+    with Image.open(path) as image:
+        return image.convert('RGB').resize(INPUT_SIZE)
+
+def view_probabilities(image):
+    """Per-view probabilities for the full view and its tiles, as the /plate endpoint computes them"""
+    views = tile_views(image)
+    return classify_on(pool, np.stack([preprocess_image(view) for view in views]))
+
+# Two foods per plate, left and right halves
+plates = []
+for _ in range(args.plates):
+    left_class, right_class = rng.sample(sorted(images_by_class), 2)
+    left, right = load(rng.choice(images_by_class[left_class])), load(rng.choice(images_by_class[right_class]))
+    plate = Image.new('RGB', (INPUT_SIZE[0] * 2, INPUT_SIZE[1]))
+    plate.paste(left, (0, 0))
+    plate.paste(right, (INPUT_SIZE[0], 0))
+    plates.append(({left_class, right_class}, view_probabilities(plate)))
+
+singles = [
+    (class_index, view_probabilities(load(path)))
+    for class_index, paths in images_by_class.items()
+    for path in paths
+]
+
+sweep = []
+for threshold in np.round(np.arange(0.1, 1.0, 0.05), 2).tolist():
+    plate_foods = [(foods, set(merge_views(probabilities, threshold)[0])) for foods, probabilities in plates]
+    single_foods = [merge_views(probabilities, threshold)[0] for _, probabilities in singles]
+    sweep.append({
+        'threshold': threshold,
+        'plates_both_found': round(float(np.mean([foods <= found for foods, found in plate_foods])), 4),
+        'plates_multiple_reported': round(float(np.mean([len(found) > 1 for _, found in plate_foods])), 4),
+        'mean_foods_per_plate': round(float(np.mean([len(found) for _, found in plate_foods])), 2),
+        'singles_extra_rate': round(float(np.mean([len(found) > 1 for found in single_foods])), 4),
+        'singles_top1_accuracy': round(float(np.mean([
+            found[0] == class_index for (class_index, _), found in zip(singles, single_foods)
+        ])), 4)
+    })
+sweep = pd.DataFrame(sweep)
+
+# Threshold finding both foods most often while keeping single-food extras in check
+acceptable = sweep[sweep['singles_extra_rate'] <= args.max_extra_rate]
+best = acceptable.sort_values(['plates_both_found', 'threshold'], ascending=[False, True]).iloc[0] if not acceptable.empty else None
+
+os.makedirs(args.output_dir, exist_ok=True)
+sweep.to_csv(os.path.join(args.output_dir, "plate_threshold_sweep.csv"), index=False)
+print(sweep.to_string(index=False))
+print(f"\nResults saved in '{args.output_dir}'.")
+if best is not None:
+    print(f"Deploy with MULTI_FOOD_THRESHOLD={best['threshold']} (both foods found on "
+          f"{best['plates_both_found']:.0%} of plates, extras on {best['singles_extra_rate']:.0%} of single foods)")
+else:
+    print(f"No threshold keeps single-food extras under {args.max_extra_rate:.0%}")
@@ -1,16 +1,29 @@
 import modal
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
 import io
 import json
 import os
-from fastapi import FastAPI, File, UploadFile
-import tensorflow as tf
+import hashlib
+import hmac
+import re
+import queue
+import threading
+import asyncio
+import time
+import random
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from fastapi import FastAPI, File, Header, HTTPException, UploadFile, WebSocket
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from typing import Dict, List, Optional
 
 # Create a Modal app
 app = modal.App("food-detection-service")
 
-# Define the class labels
+# Define the class labels of the bundled model (also listed in model_manifest.json)
 FOOD_CLASSES = {
     0: "Aloo gobi",
     1: "Bhindi fry",
@@ -34,10 +47,12 @@ FOOD_CLASSES = {
 # Get the directory where this script is located
 current_dir = os.path.dirname(os.path.abspath(__file__))
 model_path = os.path.join(current_dir, "best_model.tflite")
+manifest_path = os.path.join(current_dir, "model_manifest.json")
 
 # Create a Modal image with the required dependencies and model file
-image = modal.Image.debian_slim().pip_install(
-    "tensorflow",
+# tflite-runtime replaces the full tensorflow package for inference
+image = modal.Image.debian_slim(python_version="3.11").pip_install(
+    "tflite-runtime",
     "Pillow",
     "numpy",
     "fastapi[standard]",
@@ -45,92 +60,1199 @@ image = modal.Image.debian_slim().pip_install(
 ).add_local_file(
     model_path,  # Local path to your model file
     "/root/model.tflite"  # Path in the Modal container
+).add_local_file(
+    manifest_path,
+    "/root/model_manifest.json"
 )
 
+# Additional model versions, hot-swapped without a redeploy. Each version is a directory
+# holding a manifest.json and the .tflite file it names, uploaded with e.g.
+#   modal volume put food-detection-models ./int8_v2 /int8_v2
+models_volume = modal.Volume.from_name("food-detection-models", create_if_missing=True)
+
+# Optional cheap first-stage classifier for the cascade (see evaluate_cascade.py)
+cascade_model_path = os.path.join(current_dir, "cascade_model.tflite")
+if os.path.exists(cascade_model_path):
+    image = image.add_local_file(cascade_model_path, "/root/cascade_model.tflite")
+
+# Path of the model and its manifest inside the Modal container
+CONTAINER_MODEL_PATH = "/root/model.tflite"
+CONTAINER_MANIFEST_PATH = "/root/model_manifest.json"
+
+# Mount point of models_volume, and the file on it that selects the served versions
+MODELS_DIR = "/models"
+ACTIVE_MODELS_PATH = os.path.join(MODELS_DIR, "active.json")
+
+# How often each container checks the volume for a newly activated model. A replaced
+# model is closed once the last request that had already picked it finishes.
+REGISTRY_POLL_SECONDS = float(os.environ.get("REGISTRY_POLL_SECONDS", "30"))
+
+# Model versions are directory names on the volume
+MODEL_VERSION_PATTERN = re.compile(r"^[A-Za-z0-9._-]+$")
+
+# Bearer token required by /models/activate, from the model-admin-secret Modal secret
+# (modal secret create model-admin-secret MODEL_ADMIN_TOKEN=...). Without it the
+# endpoint refuses every activation.
+MODEL_ADMIN_TOKEN = os.environ.get("MODEL_ADMIN_TOKEN")
+
+# The cascade model answers on its own when its top probability clears CASCADE_THRESHOLD;
+# everything else falls through to the main model. Set the threshold above 1 to disable it,
+# and calibrate it for a given pair of models with evaluate_cascade.py.
+CONTAINER_CASCADE_MODEL_PATH = "/root/cascade_model.tflite"
+CASCADE_THRESHOLD = float(os.environ.get("CASCADE_THRESHOLD", "0.9"))
+
+# What a model's output tensor holds: "probabilities" when its head already ends in a
+# softmax (every training script in this repo does), or raw "logits" to be softmaxed here.
+# Served models declare it in their manifest's "outputs" field.
+MODEL_OUTPUTS = ("probabilities", "logits")
+CASCADE_MODEL_OUTPUTS = os.environ.get("CASCADE_MODEL_OUTPUTS", "probabilities")
+
+# Default model input size (width, height); served models take theirs from the manifest
+INPUT_SIZE = (300, 300)
+
+# Uploads larger than this are rejected before decoding
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Room for multipart boundaries and part headers on top of the images themselves
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# CPU cores reserved for each serving container (cpu= of the Modal functions)
+CONTAINER_CPUS = 2.0
+
+def available_cores() -> int:
+    """
+    Cores this container may use: the scheduler affinity, capped at CONTAINER_CPUS.
+    os.cpu_count() reports the host's cores, which can be far more than the allocation
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, min(cores, int(CONTAINER_CPUS)))
+
+# Interpreter threading: NUM_INTERPRETERS interpreters (one per inference worker thread),
+# each running INTERPRETER_THREADS intra-op threads. The default is one single-threaded
+# interpreter per available core; benchmark_interpreters.py measures which split suits the host.
+INTERPRETER_THREADS = int(os.environ.get("INTERPRETER_THREADS", "1"))
+NUM_INTERPRETERS = int(os.environ.get("NUM_INTERPRETERS", str(max(1, available_cores() // INTERPRETER_THREADS))))
+
+# XNNPACK is TFLite's default CPU delegate for float (and quantized) ops; 0 turns it off
+USE_XNNPACK = os.environ.get("USE_XNNPACK", "1") == "1"
+
+# Micro-batching knobs: a batch is dispatched once it holds MAX_BATCH_SIZE images
+# or BATCH_WINDOW_MS has passed since its first image arrived. A larger window
+# trades per-request latency for throughput; 0 disables batching.
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", "10"))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "8"))
+
+# Number of most likely classes returned per image
+TOP_K = 3
+
+# Most images accepted by one /batch request
+MAX_BATCH_IMAGES = int(os.environ.get("MAX_BATCH_IMAGES", "32"))
+
+# Result cache sizes, and the largest dHash Hamming distance (out of 64 bits)
+# at which two uploads count as the same photo
+EXACT_CACHE_SIZE = int(os.environ.get("EXACT_CACHE_SIZE", "4096"))
+PERCEPTUAL_CACHE_SIZE = int(os.environ.get("PERCEPTUAL_CACHE_SIZE", "1024"))
+PERCEPTUAL_MAX_DISTANCE = int(os.environ.get("PERCEPTUAL_MAX_DISTANCE", "4"))
+
+# Frame streams: a frame within STREAM_FRAME_DISTANCE dHash bits of the last classified
+# frame is skipped, and predictions are an exponential moving average over softmax outputs
+# with weight STREAM_EMA_ALPHA on the newest frame
+STREAM_FRAME_DISTANCE = int(os.environ.get("STREAM_FRAME_DISTANCE", "6"))
+STREAM_EMA_ALPHA = float(os.environ.get("STREAM_EMA_ALPHA", "0.3"))
+STREAM_MAX_PENDING = int(os.environ.get("STREAM_MAX_PENDING", str(MAX_BATCH_SIZE)))
+
+# Multi-food plates: the full view plus a TILE_GRID x TILE_GRID grid of tiles, overlapping
+# by TILE_OVERLAP of a tile, classified together in one batch. A food is reported when it
+# is the top prediction of some view with at least MULTI_FOOD_THRESHOLD confidence
+# (calibrate it with evaluate_plate.py)
+TILE_GRID = int(os.environ.get("TILE_GRID", "2"))
+TILE_OVERLAP = float(os.environ.get("TILE_OVERLAP", "0.25"))
+MULTI_FOOD_THRESHOLD = float(os.environ.get("MULTI_FOOD_THRESHOLD", "0.5"))
+
+def get_tflite_api():
+    """
+    The Interpreter class and OpResolverType enum, preferring the standalone tflite_runtime
+    package and falling back to full TensorFlow
+    """
+    try:
+        from tflite_runtime.interpreter import Interpreter, OpResolverType
+    except ImportError:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+        OpResolverType = tf.lite.experimental.OpResolverType
+    return Interpreter, OpResolverType
+
+def create_interpreter(num_threads=None, model_path=CONTAINER_MODEL_PATH, use_xnnpack=USE_XNNPACK):
+    """Create a TFLite interpreter with its tensors allocated"""
+    Interpreter, OpResolverType = get_tflite_api()
+    # AUTO applies the default delegates (XNNPACK on CPU); the XNNPACK thread pool
+    # follows num_threads
+    op_resolver_type = OpResolverType.AUTO if use_xnnpack else OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    interpreter = Interpreter(
+        model_path=model_path,
+        num_threads=num_threads,
+        experimental_op_resolver_type=op_resolver_type
+    )
+    interpreter.allocate_tensors()
+    return interpreter
+
 # Load the TFLite model
 @app.function(image=image)
 def load_model():
-    import tensorflow as tf
-    interpreter = tf.lite.Interpreter(model_path="/root/model.tflite")
-    interpreter.allocate_tensors()
-    return interpreter
+    return create_interpreter()
 
-def softmax(x):
-    """Apply softmax to convert logits to probabilities"""
-    exp_x = np.exp(x - np.max(x))  # Subtract max for numerical stability
-    return exp_x / np.sum(exp_x)
+class InterpreterPool:
+    """
+    Pool of pre-allocated TFLite interpreters held for the container's lifetime.
+    Interpreters are not thread-safe, so each one is checked out by a single thread at a time.
+    """
+    
+    def __init__(self, size: int, model_path: str = CONTAINER_MODEL_PATH,
+                 num_threads: int = INTERPRETER_THREADS, use_xnnpack: bool = USE_XNNPACK,
+                 outputs: str = "probabilities"):
+        if outputs not in MODEL_OUTPUTS:
+            raise ValueError(f"Unknown model outputs '{outputs}', expected one of {MODEL_OUTPUTS}")
+        self.size = size
+        self.outputs = outputs
+        self._interpreters = queue.Queue()
+        for _ in range(size):
+            self._interpreters.put(create_interpreter(num_threads, model_path, use_xnnpack))
+    
+    @contextmanager
+    def acquire(self):
+        """Check out an interpreter, returning it to the pool when done"""
+        interpreter = self._interpreters.get()
+        try:
+            yield interpreter
+        finally:
+            self._interpreters.put(interpreter)
 
-def preprocess_image(image):
-    """Preprocess image for model input using the same preprocessing as training"""
-    if image.mode != 'RGB':
-        image = image.convert('RGB')
+_cascade_pool_lock = threading.Lock()
+
+# Request work (decoding, waiting on a batch) runs here so the async handlers never
+# block the event loop. Sized so every interpreter can be handed a full batch.
+inference_executor = ThreadPoolExecutor(max_workers=NUM_INTERPRETERS * MAX_BATCH_SIZE)
+
+def softmax(x, axis=-1):
+    """Apply softmax to convert logits to probabilities (row-wise for a batch)"""
+    exp_x = np.exp(x - np.max(x, axis=axis, keepdims=True))  # Subtract max for numerical stability
+    return exp_x / np.sum(exp_x, axis=axis, keepdims=True)
+
+def to_probabilities(output: np.ndarray, outputs: str = "probabilities") -> np.ndarray:
+    """Class probabilities from a model's output tensor, softmaxing it only if it holds logits"""
+    return softmax(output) if outputs == "logits" else output
+
+def top_k(probabilities, k=TOP_K):
+    """Return the indices of the k most likely classes for each row, best first"""
+    k = min(k, probabilities.shape[-1])
+    indices = np.argpartition(-probabilities, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(probabilities, indices, axis=-1), axis=-1)
+    return np.take_along_axis(indices, order, axis=-1)
+
+def quantize(values: np.ndarray, tensor_details) -> np.ndarray:
+    """Map float values onto a quantized input tensor's integer range"""
+    scale, zero_point = tensor_details['quantization']
+    dtype_info = np.iinfo(tensor_details['dtype'])
+    quantized = np.round(values / scale + zero_point)
+    return np.clip(quantized, dtype_info.min, dtype_info.max).astype(tensor_details['dtype'])
+
+def dequantize(values: np.ndarray, tensor_details) -> np.ndarray:
+    """Map a quantized output tensor back to float values"""
+    scale, zero_point = tensor_details['quantization']
+    return (values.astype(np.float32) - zero_point) * scale
+
+def run_batch(interpreter, batch: np.ndarray) -> np.ndarray:
+    """Run one invoke over a batch of preprocessed images, resizing the input if needed"""
+    input_details = interpreter.get_input_details()[0]
+    output_details = interpreter.get_output_details()[0]
     
-    # Resize to match training size
-    image = image.resize((300, 300))
+    # Verify input shape and type
+    expected_shape = tuple(input_details['shape'])
+    if batch.shape[1:] != expected_shape[1:]:
+        raise ValueError(f"Input shape mismatch. Expected {expected_shape}, got {batch.shape}")
     
-    # Convert to numpy array
-    image_array = np.array(image, dtype=np.float32)
+    # Resize the batch dimension only when it changes
+    if batch.shape != expected_shape:
+        interpreter.resize_tensor_input(input_details['index'], batch.shape)
+        interpreter.allocate_tensors()
     
-    # Apply EfficientNet preprocessing
-    image_array = tf.keras.applications.efficientnet.preprocess_input(image_array)
+    # Quantized (INT8) models take and return integer tensors
+    if input_details['dtype'] != np.float32:
+        batch = quantize(batch, input_details)
     
-    return image_array.astype(np.float32)
+    interpreter.set_tensor(input_details['index'], batch)
+    interpreter.invoke()
+    output = interpreter.get_tensor(output_details['index'])
+    
+    if output_details['dtype'] != np.float32:
+        output = dequantize(output, output_details)
+    return output
 
-# Process image and make prediction
-@app.function(image=image)
-def predict_food(image_bytes: bytes) -> str:
-    import tensorflow as tf
+class CascadeStats:
+    """Counts how many images the cascade model answered and how many it escalated"""
+    
+    def __init__(self):
+        self.answered = 0
+        self.escalated = 0
+        self._lock = threading.Lock()
+    
+    def record(self, answered: int, escalated: int):
+        with self._lock:
+            self.answered += answered
+            self.escalated += escalated
+    
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.answered + self.escalated
+            return {
+                "answered": self.answered,
+                "escalated": self.escalated,
+                "escalation_rate": self.escalated / total if total else 0.0
+            }
+
+cascade_stats = CascadeStats()
+
+def classify_on(pool: InterpreterPool, images: np.ndarray) -> np.ndarray:
+    """Run one invoke on a pooled interpreter and return class probabilities"""
+    with pool.acquire() as interpreter:
+        return to_probabilities(run_batch(interpreter, images), pool.outputs)
+
+def classify_batch(pool: InterpreterPool, images: np.ndarray, cascade_pool: InterpreterPool = None,
+                   threshold: float = CASCADE_THRESHOLD) -> list:
+    """
+    Classify a stacked batch of preprocessed images with one invoke on a pooled interpreter.
+    With a cascade pool, the cheap model runs first and only the images it is unsure
+    about are re-run, as one smaller batch, on the main model.
+    Returns one dict per image with its class probabilities and top-k class indices.
+    """
+    if cascade_pool is None:
+        probabilities = classify_on(pool, images)
+    else:
+        probabilities = classify_on(cascade_pool, images)
+        escalate = np.max(probabilities, axis=-1) < threshold
+        if np.any(escalate):
+            probabilities[escalate] = classify_on(pool, images[escalate])
+        cascade_stats.record(int(np.sum(~escalate)), int(np.sum(escalate)))
+    
+    # Vectorized top-k over the whole batch
+    top_indices = top_k(probabilities)
+    return [
+        {"probabilities": probs, "top_k": indices}
+        for probs, indices in zip(probabilities, top_indices)
+    ]
+
+_cascade_pool = None
+
+def get_cascade_pool():
+    """Return the container's cascade model pool, or None when the cascade is disabled"""
+    global _cascade_pool
+    if CASCADE_THRESHOLD > 1 or not os.path.exists(CONTAINER_CASCADE_MODEL_PATH):
+        return None
+    with _cascade_pool_lock:
+        if _cascade_pool is None:
+            _cascade_pool = InterpreterPool(
+                NUM_INTERPRETERS, model_path=CONTAINER_CASCADE_MODEL_PATH, outputs=CASCADE_MODEL_OUTPUTS
+            )
+    return _cascade_pool
+
+class MicroBatcher:
+    """
+    Collects single-image requests into batches and runs one interpreter invoke per batch.
+    Each worker thread owns one interpreter from the pool for the batch it runs.
+    """
+    
+    def __init__(self, pool: InterpreterPool, window_ms: float = BATCH_WINDOW_MS,
+                 max_batch_size: int = MAX_BATCH_SIZE, cascade_pool: InterpreterPool = None):
+        self.pool = pool
+        self.cascade_pool = cascade_pool
+        self.window = window_ms / 1000
+        self.max_batch_size = max(1, max_batch_size)
+        self._requests = queue.Queue()
+        self._closed = False
+        # Only one worker gathers a batch at a time so concurrent workers don't split it
+        self._collect_lock = threading.Lock()
+        self._workers = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(pool.size)
+        ]
+        for worker in self._workers:
+            worker.start()
+    
+    def submit(self, image_array: np.ndarray) -> Future:
+        """
+        Queue one preprocessed image of shape (height, width, channels).
+        The future resolves to a dict with its class probabilities and top-k class indices.
+        """
+        if self._closed:
+            raise RuntimeError("Micro-batcher is closed")
+        future = Future()
+        self._requests.put((image_array, future))
+        return future
+    
+    def close(self):
+        """Stop the worker threads once the queued requests are done"""
+        self._closed = True
+        for _ in self._workers:
+            self._requests.put(None)
+        for worker in self._workers:
+            worker.join()
+    
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        with self._collect_lock:
+            first = self._requests.get()
+            if first is None:
+                return None
+            batch = [first]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    # Leave the shutdown signal for this worker's next loop
+                    self._requests.put(None)
+                    break
+                batch.append(item)
+            return batch
+    
+    def _worker(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            futures = [future for _, future in batch]
+            try:
+                images = np.stack([image_array for image_array, _ in batch])
+                for future, result in zip(futures, classify_batch(self.pool, images, self.cascade_pool)):
+                    future.set_result(result)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU cache with hit/miss counters"""
+    
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
     
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+class PerceptualCache(LRUCache):
+    """
+    LRU cache keyed on (model version, 64-bit dHash) that also matches near-identical
+    images: a lookup hits the most recently used entry within max_distance bits.
+    """
+    
+    def __init__(self, max_size: int, max_distance: int = PERCEPTUAL_MAX_DISTANCE):
+        super().__init__(max_size)
+        self.max_distance = max_distance
+    
+    def get(self, key):
+        version, image_hash = key
+        with self._lock:
+            for cached_key in reversed(self._entries):
+                cached_version, cached_hash = cached_key
+                if cached_version == version and (cached_hash ^ image_hash).bit_count() <= self.max_distance:
+                    self._entries.move_to_end(cached_key)
+                    self.hits += 1
+                    return self._entries[cached_key]
+            self.misses += 1
+            return None
+
+def dhash(image, hash_size: int = 8) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a tiny grayscale thumbnail"""
+    thumbnail = np.asarray(image.convert('L').resize((hash_size + 1, hash_size)), dtype=np.int16)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+exact_cache = LRUCache(EXACT_CACHE_SIZE)
+perceptual_cache = PerceptualCache(PERCEPTUAL_CACHE_SIZE)
+
+def efficientnet_preprocess(image_array: np.ndarray) -> np.ndarray:
+    """
+    NumPy equivalent of tf.keras.applications.efficientnet.preprocess_input.
+    Keras EfficientNet models rescale and normalize inside the graph, so that function
+    is a pass-through and the model expects raw 0-255 float32 pixels.
+    """
+    return np.asarray(image_array, dtype=np.float32)
+
+def xception_preprocess(image_array: np.ndarray) -> np.ndarray:
+    """NumPy equivalent of tf.keras.applications.xception.preprocess_input: scale to [-1, 1]"""
+    return np.asarray(image_array, dtype=np.float32) / 127.5 - 1.0
+
+def vgg16_preprocess(image_array: np.ndarray) -> np.ndarray:
+    """NumPy equivalent of tf.keras.applications.vgg16.preprocess_input: BGR, ImageNet mean subtracted"""
+    image_array = np.asarray(image_array, dtype=np.float32)[..., ::-1]
+    return image_array - np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+# Preprocessing named by the "preprocessing" field of a model manifest
+PREPROCESSING = {
+    "efficientnet": efficientnet_preprocess,
+    "xception": xception_preprocess,
+    "vgg16": vgg16_preprocess
+}
+
+@contextmanager
+def timed(timings, stage: str):
+    """Record how long the block took, in milliseconds, as timings['<stage>_ms']"""
+    start_time = time.perf_counter()
     try:
-        # Load model
-        interpreter = load_model.local()
+        yield
+    finally:
+        if timings is not None:
+            timings[f"{stage}_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+
+def decode_image(image_bytes: bytes, target_size=INPUT_SIZE):
+    """
+    Decode an uploaded image close to the model's input size.
+    For JPEGs, draft mode makes libjpeg downscale in the DCT domain (by 1/2, 1/4 or 1/8)
+    to the smallest size still covering target_size, so a 12 MP photo is never fully decoded.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    image.draft('RGB', target_size)
+    
+    # Apply the EXIF orientation so rotated phone photos are classified upright
+    return ImageOps.exif_transpose(image)
+
+def preprocess_image(image, timings=None, input_size=INPUT_SIZE, preprocessing="efficientnet"):
+    """Preprocess image for model input using the same preprocessing as training"""
+    with timed(timings, "resize"):
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # Resize to match training size
+        image = image.resize(input_size)
+    
+    with timed(timings, "normalize"):
+        # View the decoded pixels as a uint8 array, then cast once in preprocessing
+        image_array = np.asarray(image)
         
-        # Get input and output details
-        input_details = interpreter.get_input_details()
-        output_details = interpreter.get_output_details()
+        # Apply the model's preprocessing
+        return PREPROCESSING[preprocessing](image_array)
+
+def tile_views(image, grid: int = TILE_GRID, overlap: float = TILE_OVERLAP) -> list:
+    """The full image followed by a grid x grid set of overlapping crops, row by row"""
+    width, height = image.size
+    tile_width = width / (grid - (grid - 1) * overlap)
+    tile_height = height / (grid - (grid - 1) * overlap)
+    views = [image]
+    for row in range(grid):
+        for col in range(grid):
+            left = col * tile_width * (1 - overlap)
+            top = row * tile_height * (1 - overlap)
+            views.append(image.crop((round(left), round(top), round(left + tile_width), round(top + tile_height))))
+    return views
+
+def merge_views(probabilities: np.ndarray, threshold: float = MULTI_FOOD_THRESHOLD):
+    """
+    Merge per-view class probabilities (full view first) into the detected classes, most
+    confident first, and each class's confidence: its highest probability in any view.
+    Falls back to the full view's top class when no view is confident.
+    """
+    best_classes = np.argmax(probabilities, axis=1)
+    confident = probabilities[np.arange(len(probabilities)), best_classes] >= threshold
+    confidences = probabilities.max(axis=0)
+    detected = set(best_classes[confident].tolist()) or {int(best_classes[0])}
+    return sorted(detected, key=lambda class_index: -confidences[class_index]), confidences
+
+def file_hash(path: str) -> str:
+    """Short SHA-256 of a file's contents"""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+class ServedModel:
+    """
+    One model version, loaded from its manifest and validated against the .tflite file,
+    with its own interpreter pool and micro-batcher.
+    
+    A manifest looks like:
+    {
+        "version": "efficientnet_b3_finetuned-1",
+        "model_file": "best_model.tflite",
+        "input_shape": [1, 300, 300, 3],
+        "input_dtype": "float32",
+        "preprocessing": "efficientnet",
+        "outputs": "probabilities",
+        "classes": ["Aloo gobi", "Bhindi fry", ...]
+    }
+    """
+    
+    def __init__(self, manifest_path: str, model_file: str = None):
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.classes = dict(enumerate(self.manifest["classes"]))
+        self.preprocessing = self.manifest["preprocessing"]
+        self.outputs = self.manifest.get("outputs", "probabilities")
+        _, height, width, _ = self.manifest["input_shape"]
+        self.input_size = (width, height)
+        self.model_path = model_file or os.path.join(os.path.dirname(manifest_path), self.manifest["model_file"])
+        
+        if self.preprocessing not in PREPROCESSING:
+            raise ValueError(f"Model {self.version}: unknown preprocessing '{self.preprocessing}'")
         
-        # Process image
-        image = Image.open(io.BytesIO(image_bytes))
-        image_array = preprocess_image(image)
-        image_array = np.expand_dims(image_array, axis=0)
+        if self.outputs not in MODEL_OUTPUTS:
+            raise ValueError(f"Model {self.version}: unknown outputs '{self.outputs}'")
         
-        # Verify input shape and type
-        expected_shape = input_details[0]['shape']
-        if image_array.shape != tuple(expected_shape):
-            raise ValueError(f"Input shape mismatch. Expected {expected_shape}, got {image_array.shape}")
+        self.pool = InterpreterPool(NUM_INTERPRETERS, model_path=self.model_path, outputs=self.outputs)
+        self.validate()
         
-        # Make prediction
-        interpreter.set_tensor(input_details[0]['index'], image_array)
-        interpreter.invoke()
-        output = interpreter.get_tensor(output_details[0]['index'])
+        # The cascade model only fronts models with the same input and classes
+        self.cascade_pool = get_cascade_pool()
+        if self.cascade_pool is not None and not self._cascade_compatible():
+            self.cascade_pool = None
+        self.batcher = MicroBatcher(self.pool, cascade_pool=self.cascade_pool)
         
-        # Apply softmax to convert logits to probabilities
-        probabilities = softmax(output[0])
+        # Cached results are keyed on this, so they never outlive a model change
+        self.cache_version = f"{self.version}:{file_hash(self.model_path)}"
+        if self.cascade_pool is not None:
+            self.cache_version += f":{file_hash(CONTAINER_CASCADE_MODEL_PATH)}:{CASCADE_THRESHOLD}"
         
-        # Get class with highest probability
-        predicted_class = np.argmax(probabilities)
-        confidence = float(probabilities[predicted_class])
+        # Requests (and streams) currently using this model, and whether it has been replaced
+        self._users = 0
+        self._retired = False
+        self._users_lock = threading.Lock()
+    
+    def validate(self):
+        """Fail at load time, not per request, if the manifest doesn't describe the model"""
+        with self.pool.acquire() as interpreter:
+            input_details = interpreter.get_input_details()[0]
+            output_details = interpreter.get_output_details()[0]
+        
+        expected_shape = tuple(self.manifest["input_shape"])
+        if tuple(input_details['shape'][1:]) != expected_shape[1:]:
+            raise ValueError(
+                f"Model {self.version}: manifest input shape {list(expected_shape)} "
+                f"does not match model input shape {input_details['shape'].tolist()}"
+            )
+        if np.dtype(input_details['dtype']).name != self.manifest["input_dtype"]:
+            raise ValueError(
+                f"Model {self.version}: manifest input dtype {self.manifest['input_dtype']} "
+                f"does not match model input dtype {np.dtype(input_details['dtype']).name}"
+            )
+        if output_details['shape'][-1] != len(self.classes):
+            raise ValueError(
+                f"Model {self.version}: manifest lists {len(self.classes)} classes "
+                f"but the model outputs {output_details['shape'][-1]}"
+            )
+    
+    def _cascade_compatible(self) -> bool:
+        with self.cascade_pool.acquire() as interpreter:
+            input_shape = interpreter.get_input_details()[0]['shape']
+            output_shape = interpreter.get_output_details()[0]['shape']
+        return (tuple(input_shape[1:]) == tuple(self.manifest["input_shape"][1:])
+                and output_shape[-1] == len(self.classes))
+    
+    def preprocess(self, image, timings=None) -> np.ndarray:
+        return preprocess_image(image, timings, self.input_size, self.preprocessing)
+    
+    def close(self):
+        self.batcher.close()
+    
+    def retain(self):
+        with self._users_lock:
+            self._users += 1
+    
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            close = self._retired and self._users == 0
+        if close:
+            self.close()
+    
+    def retire(self):
+        """Close the model once the requests already using it have finished"""
+        with self._users_lock:
+            self._retired = True
+            close = self._users == 0
+        if close:
+            self.close()
+
+class ModelRegistry:
+    """
+    Holds the served model versions and atomically swaps in new ones.
+    A primary version serves all traffic except a candidate_fraction share routed to an
+    optional candidate version, so quantized variants can be A/B tested under live load.
+    """
+    
+    def __init__(self):
+        self.primary = None
+        self.candidate = None
+        self.candidate_fraction = 0.0
+        self._active = None
+        self._lock = threading.Lock()
+        # Serializes activations from the HTTP handler and the volume-poll thread
+        self._activation_lock = threading.RLock()
+    
+    def load_model(self, version: str) -> ServedModel:
+        """Load a version from the models volume, or the model bundled with the image"""
+        if not MODEL_VERSION_PATTERN.match(version) or version in (".", ".."):
+            raise ValueError(f"Invalid model version: {version!r}")
+        for served in (self.primary, self.candidate):
+            if served is not None and served.version == version:
+                return served
+        manifest_path = os.path.join(MODELS_DIR, version, "manifest.json")
+        if os.path.exists(manifest_path):
+            return ServedModel(manifest_path)
+        with open(CONTAINER_MANIFEST_PATH) as f:
+            if json.load(f)["version"] != version:
+                raise ValueError(f"Unknown model version: {version}")
+        return ServedModel(CONTAINER_MANIFEST_PATH, model_file=CONTAINER_MODEL_PATH)
+    
+    def load_bundled(self):
+        with self._lock:
+            self.primary = ServedModel(CONTAINER_MANIFEST_PATH, model_file=CONTAINER_MODEL_PATH)
+    
+    def activate(self, primary: str, candidate: str = None, candidate_fraction: float = 0.0, publish: bool = False):
+        """
+        Load and validate the requested versions, then swap them in together.
+        With publish, also write them to the volume before another activation can start.
+        """
+        if not 0.0 <= candidate_fraction <= 1.0:
+            raise ValueError("candidate_fraction must be between 0 and 1")
+        with self._activation_lock:
+            new_primary = self.load_model(primary)
+            new_candidate = self.load_model(candidate) if candidate else None
+            
+            with self._lock:
+                retired = {self.primary, self.candidate} - {new_primary, new_candidate, None}
+                self.primary = new_primary
+                self.candidate = new_candidate
+                self.candidate_fraction = candidate_fraction if new_candidate else 0.0
+                self._active = {"primary": primary, "candidate": candidate, "candidate_fraction": candidate_fraction}
+            
+            # Requests that already picked a retired model finish on it before it stops
+            for served in retired:
+                served.retire()
+            if publish:
+                self.publish()
+        print(f"Serving model {primary}" + (f" with candidate {candidate} at {candidate_fraction:.0%}" if candidate else ""))
+    
+    def select(self) -> ServedModel:
+        """Pick the model for one request and retain it; the caller must release it"""
+        with self._lock:
+            if self.candidate is not None and random.random() < self.candidate_fraction:
+                served = self.candidate
+            else:
+                served = self.primary
+            served.retain()
+            return served
+    
+    def sync(self):
+        """Apply the volume's active.json if another container changed it"""
+        with self._activation_lock:
+            models_volume.reload()
+            if not os.path.exists(ACTIVE_MODELS_PATH):
+                return
+            with open(ACTIVE_MODELS_PATH) as f:
+                active = json.load(f)
+            if active != self._active:
+                self.activate(active["primary"], active.get("candidate"), active.get("candidate_fraction", 0.0))
+    
+    def poll(self):
+        while True:
+            time.sleep(REGISTRY_POLL_SECONDS)
+            try:
+                self.sync()
+            except Exception as e:
+                print(f"Error syncing model registry: {str(e)}")
+    
+    def publish(self):
+        """Persist the active versions so every container picks them up"""
+        with open(ACTIVE_MODELS_PATH, "w") as f:
+            json.dump(self._active, f)
+        models_volume.commit()
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "primary": self.primary.version if self.primary else None,
+                "candidate": self.candidate.version if self.candidate else None,
+                "candidate_fraction": self.candidate_fraction
+            }
+
+registry = ModelRegistry()
+_registry_lock = threading.Lock()
+
+def load_registry():
+    """Load the bundled model and any activated versions, once per container"""
+    if registry.primary is None:
+        with _registry_lock:
+            if registry.primary is None:
+                registry.load_bundled()
+                try:
+                    registry.sync()
+                except Exception as e:
+                    print(f"Error syncing model registry: {str(e)}")
+
+@contextmanager
+def served_model():
+    """The model for one request (or stream), kept open until the block exits"""
+    load_registry()
+    served = registry.select()
+    try:
+        yield served
+    finally:
+        served.release()
+
+class RequestSizeLimit:
+    """
+    ASGI middleware capping request bodies before the multipart parser spools them: a
+    declared Content-Length over the limit is rejected up front, and a body streamed
+    without one is cut off with a 413 as soon as it passes the limit. /batch requests
+    may carry MAX_BATCH_IMAGES uploads, every other request one.
+    """
+    
+    def __init__(self, app, max_upload_bytes: int = MAX_UPLOAD_BYTES, max_batch_images: int = MAX_BATCH_IMAGES):
+        self.app = app
+        self.max_upload_bytes = max_upload_bytes
+        self.max_batch_images = max_batch_images
+    
+    def max_bytes(self, path: str) -> int:
+        images = self.max_batch_images if path.rstrip("/").endswith("/batch") else 1
+        return images * self.max_upload_bytes + MULTIPART_OVERHEAD_BYTES
+    
+    def too_large(self, max_bytes: int) -> str:
+        return f"Request too large. Maximum size is {max_bytes} bytes"
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        max_bytes = self.max_bytes(scope["path"])
         
-        # Get class name from mapping
-        class_name = FOOD_CLASSES.get(predicted_class, f"Unknown class {predicted_class}")
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse(status_code=413, content={"detail": self.too_large(max_bytes)})
+            return await response(scope, receive, send)
         
-        return f"Detected: {class_name} (Confidence: {confidence:.2%})"
+        received = 0
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise HTTPException(status_code=413, detail=self.too_large(max_bytes))
+            return message
         
+        await self.app(scope, limited_receive, send)
+
+async def read_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> bytes:
+    """
+    Read an uploaded file in chunks, rejecting it as soon as it exceeds max_bytes.
+    The multipart body has already been received by then, so this guards decoding only;
+    RequestSizeLimit is what bounds how much a request can make the server read.
+    """
+    buffer = bytearray()
+    while True:
+        chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer += chunk
+        if len(buffer) > max_bytes:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image too large. Maximum size is {max_bytes} bytes"
+            )
+    return bytes(buffer)
+
+class FoodPrediction(BaseModel):
+    food: str
+    confidence: float
+
+class DetectionResponse(BaseModel):
+    # Formatted "Detected: <food> (Confidence: <pct>)" string kept for existing clients
+    prediction: str
+    food: Optional[str] = None
+    confidence: Optional[float] = None
+    top_k: List[FoodPrediction] = []
+    timings: Dict[str, float] = {}
+    model_version: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchDetectionResponse(BaseModel):
+    results: List[DetectionResponse]
+    timings: Dict[str, float] = {}
+
+class PlateDetectionResponse(BaseModel):
+    # "Detected: <food> (Confidence: <pct>), <food> (Confidence: <pct>)"
+    prediction: str
+    foods: List[FoodPrediction] = []
+    views: int = 0
+    timings: Dict[str, float] = {}
+    model_version: Optional[str] = None
+    error: Optional[str] = None
+
+class StreamDetectionResponse(DetectionResponse):
+    # Smoothed over every classified frame of the stream so far
+    frames: int = 0
+    skipped_frames: int = 0
+    dropped_frames: int = 0
+    classified_frames: int = 0
+
+def prepare_image(served: ServedModel, image_bytes: bytes, timings=None):
+    """
+    Look an upload up in the result caches, decoding and preprocessing it on a miss.
+    Returns (cached_result, None, cache_keys) on a hit and (None, image_array, cache_keys) on a miss.
+    """
+    model_version = served.cache_version
+    
+    # Same bytes as an earlier upload
+    exact_key = (model_version, hashlib.sha256(image_bytes).hexdigest())
+    result = exact_cache.get(exact_key)
+    if result is not None:
+        return result, None, (exact_key, None)
+    
+    # Process image
+    with timed(timings, "decode"):
+        image = decode_image(image_bytes, served.input_size)
+    
+    # Near-identical frame of an earlier upload
+    perceptual_key = (model_version, dhash(image))
+    result = perceptual_cache.get(perceptual_key)
+    if result is not None:
+        exact_cache.put(exact_key, result)
+        return result, None, (exact_key, perceptual_key)
+    
+    return None, served.preprocess(image, timings), (exact_key, perceptual_key)
+
+def cache_result(cache_keys, result):
+    """Store a fresh inference result under both of its cache keys"""
+    exact_key, perceptual_key = cache_keys
+    exact_cache.put(exact_key, result)
+    perceptual_cache.put(perceptual_key, result)
+
+def build_response(served: ServedModel, result, timings=None) -> DetectionResponse:
+    """Turn a classification result into the structured top-k response"""
+    top_predictions = [
+        FoodPrediction(
+            food=served.classes.get(int(class_index), f"Unknown class {class_index}"),
+            confidence=float(result["probabilities"][class_index])
+        )
+        for class_index in result["top_k"]
+    ]
+    best = top_predictions[0]
+    return DetectionResponse(
+        prediction=f"Detected: {best.food} (Confidence: {best.confidence:.2%})",
+        food=best.food,
+        confidence=best.confidence,
+        top_k=top_predictions,
+        timings=timings or {},
+        model_version=served.version
+    )
+
+def error_response(e: Exception) -> DetectionResponse:
+    return DetectionResponse(prediction=f"Error during prediction: {str(e)}", error=str(e))
+
+def detect(image_bytes: bytes, timings=None) -> DetectionResponse:
+    """Classify one upload through the caches and the micro-batcher"""
+    try:
+        with served_model() as served:
+            result, image_array, cache_keys = prepare_image(served, image_bytes, timings)
+            if result is None:
+                # Make prediction as part of the next micro-batch
+                with timed(timings, "inference"):
+                    result = served.batcher.submit(image_array).result()
+                cache_result(cache_keys, result)
+            return build_response(served, result, timings)
     except Exception as e:
-        return f"Error during prediction: {str(e)}"
+        return error_response(e)
 
-# Create FastAPI app using ASGI
+def detect_batch(images_bytes: List[bytes], timings=None) -> BatchDetectionResponse:
+    """Classify several uploads, running every cache miss through a single batched invoke"""
+    with served_model() as served:
+        responses = [None] * len(images_bytes)
+        pending = []  # (position, image_array, cache_keys) for cache misses
+        
+        with timed(timings, "preprocess"):
+            for position, image_bytes in enumerate(images_bytes):
+                try:
+                    result, image_array, cache_keys = prepare_image(served, image_bytes)
+                    if result is None:
+                        pending.append((position, image_array, cache_keys))
+                    else:
+                        responses[position] = build_response(served, result)
+                except Exception as e:
+                    responses[position] = error_response(e)
+        
+        if pending:
+            with timed(timings, "inference"):
+                try:
+                    images = np.stack([image_array for _, image_array, _ in pending])
+                    results = classify_batch(served.pool, images, served.cascade_pool)
+                except Exception as e:
+                    results = [e] * len(pending)
+            for (position, _, cache_keys), result in zip(pending, results):
+                if isinstance(result, Exception):
+                    responses[position] = error_response(result)
+                else:
+                    cache_result(cache_keys, result)
+                    responses[position] = build_response(served, result)
+        
+        return BatchDetectionResponse(results=responses, timings=timings or {})
+
+def detect_foods(image_bytes: bytes, timings=None) -> PlateDetectionResponse:
+    """Detect every food on a plate, classifying the full view and its tiles in one batched invoke"""
+    try:
+        with served_model() as served:
+            width, height = served.input_size
+            
+            # Decode at the tiles' resolution rather than the full view's
+            with timed(timings, "decode"):
+                image = decode_image(image_bytes, (width * TILE_GRID, height * TILE_GRID))
+            with timed(timings, "preprocess"):
+                views = tile_views(image)
+                images = np.stack([served.preprocess(view) for view in views])
+            
+            with timed(timings, "inference"):
+                results = classify_batch(served.pool, images, served.cascade_pool)
+            detected, confidences = merge_views(np.stack([result["probabilities"] for result in results]))
+            
+            foods = [
+                FoodPrediction(
+                    food=served.classes.get(class_index, f"Unknown class {class_index}"),
+                    confidence=float(confidences[class_index])
+                )
+                for class_index in detected
+            ]
+            return PlateDetectionResponse(
+                prediction="Detected: " + ", ".join(f"{food.food} (Confidence: {food.confidence:.2%})" for food in foods),
+                foods=foods,
+                views=len(views),
+                timings=timings or {},
+                model_version=served.version
+            )
+    except Exception as e:
+        return PlateDetectionResponse(prediction=f"Error during prediction: {str(e)}", error=str(e))
+
+class FrameStream:
+    """
+    Per-stream state for video and live camera frames. Frames that barely differ from
+    the last classified frame are skipped, so inference cost follows unique content
+    rather than frame rate, and the reported prediction is a moving average of the
+    classified frames' softmax outputs.
+    """
+    
+    def __init__(self, served: ServedModel, alpha: float = STREAM_EMA_ALPHA,
+                 max_distance: int = STREAM_FRAME_DISTANCE):
+        self.served = served
+        self.alpha = alpha
+        self.max_distance = max_distance
+        self.last_hash = None
+        self.smoothed = None
+        self.frames = 0
+        self.skipped_frames = 0
+        self.dropped_frames = 0
+        self.classified_frames = 0
+    
+    def prepare(self, frame_bytes: bytes) -> Optional[np.ndarray]:
+        """Decode a frame, returning None if it is a near-duplicate of the last classified frame"""
+        self.frames += 1
+        image = decode_image(frame_bytes, self.served.input_size)
+        frame_hash = dhash(image)
+        if self.last_hash is not None and (frame_hash ^ self.last_hash).bit_count() <= self.max_distance:
+            self.skipped_frames += 1
+            return None
+        self.last_hash = frame_hash
+        return self.served.preprocess(image)
+    
+    def classify(self, images: np.ndarray) -> StreamDetectionResponse:
+        """Classify frames in one batched invoke and fold them, in order, into the moving average"""
+        results = classify_batch(self.served.pool, images, self.served.cascade_pool)
+        for result in results:
+            probabilities = result["probabilities"]
+            if self.smoothed is None:
+                self.smoothed = probabilities
+            else:
+                self.smoothed = self.alpha * probabilities + (1 - self.alpha) * self.smoothed
+        self.classified_frames += len(results)
+        
+        result = {"probabilities": self.smoothed, "top_k": top_k(self.smoothed[np.newaxis])[0]}
+        return StreamDetectionResponse(
+            **build_response(self.served, result).model_dump(),
+            frames=self.frames,
+            skipped_frames=self.skipped_frames,
+            dropped_frames=self.dropped_frames,
+            classified_frames=self.classified_frames
+        )
+
+# Process image and make prediction
 @app.function(image=image)
+def predict_food(image_bytes: bytes, timings=None) -> str:
+    return detect(image_bytes, timings).prediction
+
+class ModelActivation(BaseModel):
+    primary: str
+    candidate: Optional[str] = None
+    candidate_fraction: float = 0.0
+
+# Create FastAPI app using ASGI
+@app.function(
+    image=image,
+    cpu=CONTAINER_CPUS,
+    volumes={MODELS_DIR: models_volume},
+    secrets=[modal.Secret.from_name("model-admin-secret")]
+)
 @modal.asgi_app()
 def fastapi_app():
-    from fastapi import FastAPI, File, UploadFile
-    
     web_app = FastAPI()
+    web_app.add_middleware(RequestSizeLimit)
+    
+    # Load and validate the served model(s) when the container starts, then follow
+    # activations made from other containers
+    load_registry()
+    threading.Thread(target=registry.poll, daemon=True).start()
     
-    @web_app.post("/")
+    @web_app.post("/", response_model=DetectionResponse)
     async def detect_food(image: UploadFile = File(...)):
-        contents = await image.read()
-        result = predict_food.local(contents)
-        return {"prediction": result}
+        timings = {}
+        with timed(timings, "read"):
+            contents = await read_upload(image)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(inference_executor, detect, contents, timings)
+    
+    @web_app.post("/batch", response_model=BatchDetectionResponse)
+    async def detect_food_batch(images: List[UploadFile] = File(...)):
+        if len(images) > MAX_BATCH_IMAGES:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Too many images. Maximum is {MAX_BATCH_IMAGES} per request"
+            )
+        timings = {}
+        with timed(timings, "read"):
+            contents = [await read_upload(image) for image in images]
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(inference_executor, detect_batch, contents, timings)
+    
+    @web_app.post("/plate", response_model=PlateDetectionResponse)
+    async def detect_plate(image: UploadFile = File(...)):
+        timings = {}
+        with timed(timings, "read"):
+            contents = await read_upload(image)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(inference_executor, detect_foods, contents, timings)
+    
+    @web_app.websocket("/stream")
+    async def detect_food_stream(websocket: WebSocket):
+        # Each binary message is one encoded frame (JPEG, PNG, ...). Whenever new unique
+        # frames have been classified, the smoothed prediction is sent back as JSON
+        await websocket.accept()
+        loop = asyncio.get_running_loop()
+        # The stream stays on the model version it started with, which is kept open
+        # until the stream ends
+        load_registry()
+        served = registry.select()
+        stream = FrameStream(served)
+        # Unique frames waiting for inference. A live stream that outruns inference
+        # drops its oldest waiting frames rather than falling behind
+        pending = deque(maxlen=STREAM_MAX_PENDING)
+        frames_ready = asyncio.Event()
+        closed = False
+        
+        async def receive_frames():
+            nonlocal closed
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        break
+                    frame_bytes = message.get("bytes")
+                    if not frame_bytes:
+                        continue
+                    try:
+                        if len(frame_bytes) > MAX_UPLOAD_BYTES:
+                            raise ValueError(f"Frame too large. Maximum size is {MAX_UPLOAD_BYTES} bytes")
+                        image_array = await loop.run_in_executor(inference_executor, stream.prepare, frame_bytes)
+                    except Exception as e:
+                        await websocket.send_json(error_response(e).model_dump())
+                        continue
+                    if image_array is not None:
+                        if len(pending) == pending.maxlen:
+                            stream.dropped_frames += 1
+                        pending.append(image_array)
+                        frames_ready.set()
+            finally:
+                closed = True
+                frames_ready.set()
+        
+        async def classify_frames():
+            while True:
+                await frames_ready.wait()
+                frames_ready.clear()
+                if not pending:
+                    if closed:
+                        return
+                    continue
+                images = np.stack(pending)
+                pending.clear()
+                try:
+                    response = await loop.run_in_executor(inference_executor, stream.classify, images)
+                except Exception as e:
+                    response = error_response(e)
+                if not closed:
+                    await websocket.send_json(response.model_dump())
+        
+        try:
+            await asyncio.gather(receive_frames(), classify_frames())
+        finally:
+            served.release()
+    
+    @web_app.get("/models")
+    def list_models():
+        models_volume.reload()
+        available = sorted(
+            version for version in os.listdir(MODELS_DIR)
+            if os.path.exists(os.path.join(MODELS_DIR, version, "manifest.json"))
+        )
+        return {**registry.stats(), "available": available}
+    
+    @web_app.post("/models/activate")
+    def activate_model(activation: ModelActivation, authorization: Optional[str] = Header(None)):
+        if not MODEL_ADMIN_TOKEN:
+            raise HTTPException(status_code=403, detail="Model activation is not configured")
+        if not hmac.compare_digest((authorization or "").encode(), f"Bearer {MODEL_ADMIN_TOKEN}".encode()):
+            raise HTTPException(status_code=401, detail="Invalid or missing admin token")
+        try:
+            registry.activate(activation.primary, activation.candidate, activation.candidate_fraction, publish=True)
+        except (ValueError, KeyError, OSError) as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return registry.stats()
+    
+    @web_app.get("/metrics")
+    async def metrics():
+        return {
+            "models": registry.stats(),
+            "exact_cache": exact_cache.stats(),
+            "perceptual_cache": perceptual_cache.stats(),
+            "cascade": cascade_stats.stats() if get_cascade_pool() is not None else None
+        }
     
     return web_app
\ No newline at end of file
@@ -0,0 +1,130 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from food_detection_service import MODEL_OUTPUTS, create_interpreter, run_batch, to_probabilities, top_k
+
+# Export the finetuned classifier as float32, dynamic-range, float16 and full-integer
+# INT8 TFLite models, then compare their accuracy, size and CPU latency.
+# Usage: python quantize_model.py --keras-model best_model.keras --val-dir <val> --test-dir <test>
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="TFLite quantization export and report")
+parser.add_argument("--keras-model", default=os.path.join(
+    current_dir, "Finetuned model", "EfficientNet_B3_finetuned", "B3_finetuned_results", "best_model.keras"))
+parser.add_argument("--val-dir", required=True, help="Validation split, used for INT8 calibration")
+parser.add_argument("--test-dir", required=True, help="Test split, used for the accuracy report")
+parser.add_argument("--model-outputs", default="probabilities", choices=MODEL_OUTPUTS,
+                    help="Whether the model's head already applies softmax")
+parser.add_argument("--image-size", type=int, default=300)
+parser.add_argument("--calibration-samples", type=int, default=200)
+parser.add_argument("--latency-runs", type=int, default=50)
+parser.add_argument("--batch-size", type=int, default=8)
+parser.add_argument("--output-dir", default=os.path.join(current_dir, "quantized_models"))
+args = parser.parse_args()
+
+os.makedirs(args.output_dir, exist_ok=True)
+image_size = (args.image_size, args.image_size)
+
+# compile=False skips the custom F1Score metric, which is only needed for training
+model = tf.keras.models.load_model(args.keras_model, compile=False)
+
+val_data = tf.keras.preprocessing.image_dataset_from_directory(
+    args.val_dir,
+    image_size=image_size,
+    batch_size=1,
+    label_mode="int",
+    shuffle=True,
+    seed=42
+)
+
+test_data = tf.keras.preprocessing.image_dataset_from_directory(
+    args.test_dir,
+    image_size=image_size,
+    batch_size=1,
+    label_mode="int",
+    shuffle=False
+)
+
+def representative_dataset():
+    """Calibration images sampled from the validation split, as raw 0-255 float pixels"""
+    for images, _ in val_data.take(args.calibration_samples):
+        yield [tf.cast(images, tf.float32)]
+
+def convert(variant):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if variant == "dynamic_range":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        # Keep uint8 I/O so clients can feed raw pixels without a float conversion
+        converter.inference_input_type = tf.uint8
+        converter.inference_output_type = tf.uint8
+    return converter.convert()
+
+def measure_latency_ms(interpreter, batch):
+    """Median latency of one invoke over the given batch, in milliseconds"""
+    run_batch(interpreter, batch)  # Warm up this batch shape
+    latencies = []
+    for _ in range(args.latency_runs):
+        start_time = time.perf_counter()
+        run_batch(interpreter, batch)
+        latencies.append(time.perf_counter() - start_time)
+    return float(np.median(latencies)) * 1000
+
+# Test images are loaded once and shared by every variant
+test_images, test_labels = [], []
+for images, labels in test_data:
+    test_images.append(images.numpy()[0])
+    test_labels.append(int(labels.numpy()[0]))
+test_images = np.stack(test_images).astype(np.float32)
+test_labels = np.array(test_labels)
+print(f"Loaded {len(test_labels)} test images")
+
+results = []
+for variant in ["float32", "dynamic_range", "float16", "int8"]:
+    print(f"\nConverting {variant} model...")
+    tflite_path = os.path.join(args.output_dir, f"model_{variant}.tflite")
+    with open(tflite_path, "wb") as f:
+        f.write(convert(variant))
+
+    # Single-threaded, to match one interpreter per core in the service
+    interpreter = create_interpreter(num_threads=1, model_path=tflite_path)
+
+    # Accuracy
+    probabilities = np.concatenate([
+        to_probabilities(run_batch(interpreter, test_images[i:i + 1]), args.model_outputs)
+        for i in range(len(test_images))
+    ])
+    predictions = top_k(probabilities, k=3)
+    top1 = float(np.mean(predictions[:, 0] == test_labels))
+    top3 = float(np.mean(np.any(predictions == test_labels[:, np.newaxis], axis=1)))
+
+    # Latency
+    single_ms = measure_latency_ms(interpreter, test_images[:1])
+    batched_ms = measure_latency_ms(interpreter, test_images[:args.batch_size])
+
+    results.append({
+        'variant': variant,
+        'size_mb': round(os.path.getsize(tflite_path) / (1024 * 1024), 2),
+        'top1_accuracy': round(top1, 4),
+        'top3_accuracy': round(top3, 4),
+        'latency_single_ms': round(single_ms, 2),
+        f'latency_batch{args.batch_size}_ms_per_image': round(batched_ms / min(args.batch_size, len(test_images)), 2),
+        'input_dtype': interpreter.get_input_details()[0]['dtype'].__name__
+    })
+    print(results[-1])
+
+# Save report
+report_path = os.path.join(args.output_dir, "quantization_report.csv")
+pd.DataFrame(results).to_csv(report_path, index=False)
+print(f"\nQuantization report saved to: {report_path}")
+print(pd.DataFrame(results).to_string(index=False))
@@ -0,0 +1,226 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+import modal
+from fastapi import FastAPI, File, UploadFile
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+# One gateway app co-hosting the detection, analysis and recipe services in a single warm
+# process. /meal runs photo -> foods -> nutrition -> low-GL recipe without any HTTP hops
+# between services, and the existing endpoints are mounted under /detect, /analysis and
+# /assistant for clients that still call them individually.
+# Deploy with: modal deploy gateway.py
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+detection_dir = os.path.join(current_dir, "food_detection_model")
+assistant_dir = os.path.join(current_dir, "nutritional_assistant")
+
+# Locally the services live in their own directories; in the container they sit next to this file
+sys.path[:0] = [detection_dir, assistant_dir]
+
+import food_detection_service as detection
+import food_analysis_service as analysis
+import modal_app as assistant
+
+# Create Modal app
+app = modal.App("nutrivision-gateway")
+
+# Create a Modal image with the dependencies and files of all three services
+image = modal.Image.debian_slim(python_version="3.11").pip_install(
+    "tflite-runtime",
+    "Pillow",
+    "numpy",
+    "fastapi[standard]",
+    "python-multipart",
+    "uvicorn",
+    "python-dotenv",
+    "openai",
+    "torch",
+    "transformers",
+    "sentence-transformers",
+    "chromadb",
+    "pandas",
+    "pydantic"
+).add_local_file(
+    os.path.join(detection_dir, "food_detection_service.py"),
+    "/root/food_detection_service.py"
+).add_local_file(
+    detection.model_path,
+    detection.CONTAINER_MODEL_PATH
+).add_local_file(
+    detection.manifest_path,
+    detection.CONTAINER_MANIFEST_PATH
+).add_local_file(
+    os.path.join(current_dir, "food_analysis_service.py"),
+    "/root/food_analysis_service.py"
+).add_local_file(
+    analysis.nutrition_table_path,
+    "/root/nutrition_table.json"
+).add_local_file(
+    os.path.join(assistant_dir, "modal_app.py"),
+    "/root/modal_app.py"
+).add_local_dir(
+    os.path.join(assistant_dir, "agents"),
+    "/root/agents"
+).add_local_dir(
+    os.path.join(assistant_dir, "data preprocessing", "processed_data"),
+    "/root/data preprocessing/processed_data"
+).add_local_dir(
+    os.path.join(assistant_dir, "vector_database", "recipes_vectorstore"),
+    "/root/vector_database/recipes_vectorstore"
+)
+
+# Optional files: the exported NumPy recipe index and the cascade model
+numpy_index_dir = os.path.join(assistant_dir, "vector_database", "recipes_numpy_index")
+if os.path.exists(numpy_index_dir):
+    image = image.add_local_dir(numpy_index_dir, "/root/vector_database/recipes_numpy_index")
+if os.path.exists(detection.cascade_model_path):
+    image = image.add_local_file(detection.cascade_model_path, detection.CONTAINER_CASCADE_MODEL_PATH)
+
+# Recipe candidates fetched from the vector database for the /meal suggestion
+RECIPE_CANDIDATES = int(os.environ.get("RECIPE_CANDIDATES", "5"))
+
+class MealFood(BaseModel):
+    food: str
+    confidence: float
+    calories: Optional[int] = None
+    glycemic_index: Optional[float] = None
+    glycemic_load: Optional[float] = None
+    glycemic_load_category: Optional[str] = None
+
+class RecipeSuggestion(BaseModel):
+    title: str
+    ingredients: List[str]
+    instructions: List[str]
+    glycemic_load: Optional[float] = None
+
+class MealResponse(BaseModel):
+    foods: List[MealFood] = []
+    # Totals over the foods found in the nutrition table. The glycemic load total is None
+    # when a food is unknown rather than understated, as in /analysis/analyze-meal
+    total_calories: int = 0
+    total_glycemic_load: Optional[float] = None
+    # Detected foods with no local nutrition data (use /analysis/analyze-food for these)
+    unknown_foods: List[str] = []
+    recipe: Optional[RecipeSuggestion] = None
+    model_version: Optional[str] = None
+    timings: Dict[str, float] = {}
+    error: Optional[str] = None
+
+def lookup_nutrition(food: detection.FoodPrediction) -> MealFood:
+    entry = analysis.nutrition_table.get(analysis.normalize_food_name(food.food))
+    if entry is None:
+        return MealFood(food=food.food, confidence=food.confidence)
+    return MealFood(
+        food=food.food,
+        confidence=food.confidence,
+        calories=entry["calories"],
+        glycemic_index=entry["glycemic_index"],
+        glycemic_load=entry["glycemic_load"],
+        glycemic_load_category=entry["glycemic_load_category"]
+    )
+
+def suggest_recipe(foods: List[MealFood]) -> Optional[RecipeSuggestion]:
+    """
+    A low-GL recipe in place of the meal's highest-GL food: the candidates from the vector
+    database ranked by the GI agent's glycemic load estimate, as /recommend_recipe does,
+    without the nutritional narrative
+    """
+    # Skip rather than block while the recipe agents are still loading
+    if not foods or not assistant.agents_ready():
+        return None
+    recipe_agent, gi_agent = assistant.get_agents()
+
+    target = max(foods, key=lambda food: food.glycemic_load or 0.0)
+    query = f"low glycemic {target.food.replace('_', ' ')} recipe"
+    recipes = recipe_agent.find_recipes(query, n_results=RECIPE_CANDIDATES)
+    recipes = [recipe for recipe in recipes if recipe['title']]
+    if not recipes:
+        return None
+
+    # The candidate with the lowest glycemic load
+    best = gi_agent.process(recipes)
+    if 'error' in best:
+        print(f"Error ranking recipes: {best['error']}")
+        return None
+    source = next(recipe for recipe in recipes if recipe['title'] == best['title'])
+    return RecipeSuggestion(
+        title=best['title'],
+        ingredients=source['ingredients'],
+        instructions=best['instructions'],
+        glycemic_load=round(best['glycemic_load'], 1)
+    )
+
+def analyze_meal(image_bytes: bytes, timings=None) -> MealResponse:
+    """Detect the foods on a plate, look up their nutrition and suggest a low-GL recipe"""
+    with detection.timed(timings, "detection"):
+        plate = detection.detect_foods(image_bytes, timings)
+    if plate.error:
+        return MealResponse(timings=timings or {}, error=plate.error)
+
+    with detection.timed(timings, "nutrition"):
+        foods = [lookup_nutrition(food) for food in plate.foods]
+        known = [food for food in foods if food.calories is not None]
+
+    with detection.timed(timings, "recipe"):
+        try:
+            recipe = suggest_recipe(known or foods)
+        except Exception as e:
+            print(f"Error suggesting recipe: {str(e)}")
+            recipe = None
+
+    unknown_foods = [food.food for food in foods if food.calories is None]
+    return MealResponse(
+        foods=foods,
+        total_calories=sum(food.calories for food in known),
+        total_glycemic_load=None if unknown_foods else round(sum(food.glycemic_load for food in known), 1),
+        unknown_foods=unknown_foods,
+        recipe=recipe,
+        model_version=plate.model_version,
+        timings=timings or {}
+    )
+
+# Create FastAPI app using ASGI
+@app.function(
+    image=image,
+    # The detection interpreter pool is sized from this allocation
+    cpu=detection.CONTAINER_CPUS,
+    volumes={detection.MODELS_DIR: detection.models_volume},
+    secrets=[
+        modal.Secret.from_name("openai-secret"),
+        modal.Secret.from_name("hf-secret"),
+        modal.Secret.from_name("model-admin-secret")
+    ]
+)
+@modal.asgi_app()
+def fastapi_app():
+    web_app = FastAPI()
+    # Caps every request body, /meal photos included, before it is spooled
+    web_app.add_middleware(detection.RequestSizeLimit)
+
+    # Building the detection app loads the served model; the recipe agents warm up in
+    # the background, as in the standalone nutritional assistant
+    detection_app = detection.fastapi_app.local()
+    assistant_app = assistant.fastapi_app.local()
+    threading.Thread(target=assistant.warmup_agents, daemon=True).start()
+
+    @web_app.post("/meal", response_model=MealResponse)
+    async def meal(image: UploadFile = File(...)):
+        start_time = time.perf_counter()
+        timings = {}
+        with detection.timed(timings, "read"):
+            contents = await detection.read_upload(image)
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(detection.inference_executor, analyze_meal, contents, timings)
+        response.timings["total_ms"] = round((time.perf_counter() - start_time) * 1000, 2)
+        return response
+
+    # Existing endpoints, served from the same warm models and caches
+    web_app.mount("/detect", detection_app)
+    web_app.mount("/analysis", analysis.web_app)
+    web_app.mount("/assistant", assistant_app)
+
+    return web_app
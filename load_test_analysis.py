@@ -0,0 +1,115 @@
+import os
+import time
+import tempfile
+import json
+import random
+import asyncio
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+# Load test /analyze-food against a local stand-in for the OpenAI API, which answers
+# chat completions after a simulated model latency. Shows how requests/sec and tail
+# latency scale with concurrent users now that completions no longer block the event loop.
+# Usage: python load_test_analysis.py --users 1,16,128 --llm-latency-ms 300
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+
+parser = argparse.ArgumentParser(description="/analyze-food load test with a stand-in OpenAI server")
+parser.add_argument("--users", default="1,16,128", help="Comma-separated concurrent user counts")
+parser.add_argument("--requests-per-user", type=int, default=8)
+parser.add_argument("--llm-latency-ms", type=float, default=300, help="Mean stand-in completion latency")
+parser.add_argument("--llm-jitter-ms", type=float, default=100, help="Uniform +/- jitter on that latency")
+parser.add_argument("--llm-port", type=int, default=8701)
+parser.add_argument("--service-port", type=int, default=8702)
+args = parser.parse_args()
+
+# Stand-in OpenAI chat completions endpoint
+llm_app = FastAPI()
+
+@llm_app.post("/v1/chat/completions")
+async def chat_completions(request: dict):
+    await asyncio.sleep(max(0.0, args.llm_latency_ms + random.uniform(-1, 1) * args.llm_jitter_ms) / 1000)
+    content = json.dumps({"calories": 250, "glycemic_load": "medium", "advice": "Eat a moderate portion."})
+    return {
+        "id": "chatcmpl-loadtest",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "gpt-3.5-turbo"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {"prompt_tokens": 150, "completion_tokens": 30, "total_tokens": 180}
+    }
+
+def serve(app, port: int):
+    """Run an app with uvicorn in a background thread, returning once it accepts connections"""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+# Point the service's client at the stand-in before it is created
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+os.environ["OPENAI_API_KEY"] = "load-test"
+os.environ["ANALYSIS_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(), "analysis_cache.sqlite")
+import food_analysis_service
+
+serve(llm_app, args.llm_port)
+serve(food_analysis_service.web_app, args.service_port)
+
+# Foods outside the nutrition table, with a unique description per request, so every
+# request misses the response cache and reaches the LLM
+FOODS = ["Ras malai", "brownie", "chai", "haleem", "paratha", "fried rice"]
+
+async def run_user(client: httpx.AsyncClient, user: int, latencies: list, errors: list):
+    for i in range(args.requests_per_user):
+        payload = {
+            "food_name": FOODS[(user + i) % len(FOODS)],
+            "description": f"Serving {user}-{i}",
+            "user_age": "45"
+        }
+        start_time = time.perf_counter()
+        response = await client.post(f"http://127.0.0.1:{args.service_port}/analyze-food", json=payload)
+        latencies.append(time.perf_counter() - start_time)
+        if response.status_code != 200:
+            errors.append(response.status_code)
+
+async def run_level(users: int) -> dict:
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        start_time = time.perf_counter()
+        await asyncio.gather(*[run_user(client, user, latencies, errors) for user in range(users)])
+        elapsed = time.perf_counter() - start_time
+    latencies = np.array(latencies)
+    return {
+        'users': users,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_sec': round(len(latencies) / elapsed, 2),
+        'p50_latency_ms': round(float(np.percentile(latencies, 50)) * 1000, 2),
+        'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 2),
+        'p99_latency_ms': round(float(np.percentile(latencies, 99)) * 1000, 2)
+    }
+
+print(f"Stand-in completion latency: {args.llm_latency_ms} +/- {args.llm_jitter_ms} ms, "
+      f"service limit: {food_analysis_service.OPENAI_MAX_CONCURRENCY} concurrent completions")
+results = []
+for users in [int(u) for u in args.users.split(",")]:
+    results.append(asyncio.run(run_level(users)))
+    print(results[-1])
+
+# Save results
+os.makedirs(os.path.join(current_dir, "benchmark_results"), exist_ok=True)
+csv_path = os.path.join(current_dir, "benchmark_results", "analysis_load_test.csv")
+pd.DataFrame(results).to_csv(csv_path, index=False)
+print(f"\nLoad test results saved to: {csv_path}")
+print(pd.DataFrame(results).to_string(index=False))
@@ -0,0 +1,110 @@
+import os
+import threading
+import time
+import numpy as np
+from collections import OrderedDict, Counter
+from concurrent.futures import Future
+
+# Distinct normalized queries whose embeddings are kept
+QUERY_CACHE_SIZE = int(os.environ.get("QUERY_CACHE_SIZE", "4096"))
+# Most queries encoded in one forward pass
+ENCODER_MAX_BATCH = int(os.environ.get("ENCODER_MAX_BATCH", "32"))
+# How long the first query of a batch waits for others to join it
+ENCODER_MAX_WAIT_MS = float(os.environ.get("ENCODER_MAX_WAIT_MS", "5"))
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.casefold().split())
+
+class QueryEncoder:
+    """
+    Query embeddings through an LRU cache keyed on the normalized query. Misses from
+    concurrent requests are queued for one background thread, which encodes everything
+    pending (up to max_batch) in a single model.encode call.
+    """
+
+    def __init__(self, model, cache_size: int = QUERY_CACHE_SIZE, max_batch: int = ENCODER_MAX_BATCH,
+                 max_wait_ms: float = ENCODER_MAX_WAIT_MS):
+        self.model = model
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.hits = 0
+        self.misses = 0
+        self.batch_sizes = Counter()
+        self._cache = OrderedDict()
+        # Queries waiting to be encoded, and the futures of those queued or being encoded
+        self._queue = []
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._worker = None
+
+    def encode(self, query: str) -> np.ndarray:
+        """The embedding of one query (read-only; shared with other callers)"""
+        key = normalize_query(query)
+        with self._lock:
+            embedding = self._cache.get(key)
+            if embedding is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return embedding
+            self.misses += 1
+            future = self._pending.get(key)
+            if future is None:
+                future = Future()
+                self._pending[key] = future
+                self._queue.append(key)
+                self._ready.notify()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+        return future.result()
+
+    def _next_batch(self) -> list:
+        with self._lock:
+            while not self._queue:
+                self._ready.wait()
+            # Give concurrent requests a moment to join the first query's batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._ready.wait(remaining)
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            self.batch_sizes[len(batch)] += 1
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                embeddings = np.asarray(self.model.encode(batch))
+                embeddings.setflags(write=False)
+            except Exception as e:
+                with self._lock:
+                    futures = [self._pending.pop(key) for key in batch]
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                futures = [self._pending.pop(key) for key in batch]
+                for key, embedding in zip(batch, embeddings):
+                    self._cache[key] = embedding
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            for future, embedding in zip(futures, embeddings):
+                future.set_result(embedding)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": len(self._cache),
+                "batches": sum(self.batch_sizes.values()),
+                "batch_size_histogram": {str(size): count for size, count in sorted(self.batch_sizes.items())}
+            }
@@ -1,12 +1,14 @@
 import os
 import json
 import openai
-import chromadb
 import pandas as pd
 import time
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any
 from sentence_transformers import SentenceTransformer
 from .base_agent import BaseAgent
+from .vector_index import create_index
+from .query_encoder import QueryEncoder
+from .semantic_cache import SemanticCache
 
 class RecipeRecommendationAgent(BaseAgent):
     """
@@ -14,8 +16,13 @@ class RecipeRecommendationAgent(BaseAgent):
     Returns 3 recipes with nutritional information for glycemic load analysis.
     """
     
-    def __init__(self):
-        """Initialize the recipe recommendation agent"""
+    def __init__(self, index_backend: str = None):
+        """
+        Initialize the recipe recommendation agent
+        
+        Args:
+            index_backend (str): "chroma", "numpy" or "auto" (default: RECIPE_INDEX_BACKEND, else "auto")
+        """
         super().__init__(name="Recipe Recommendation Agent")
         
         # Initialize components
@@ -23,10 +30,14 @@ class RecipeRecommendationAgent(BaseAgent):
         start_time = time.time()
         self.model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
         print(f"Sentence transformer initialized in {time.time() - start_time:.2f} seconds")
+        self.encoder = QueryEncoder(self.model)
+        # Recipes and narratives of earlier queries, reused for near-identical ones
+        self.answer_cache = SemanticCache()
         
         self.db_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "vector_database", "recipes_vectorstore")
-        self.client = None
-        self.collection = None
+        self.numpy_index_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "vector_database", "recipes_numpy_index")
+        self.index_backend = index_backend or os.environ.get("RECIPE_INDEX_BACKEND", "auto")
+        self.index = None
         self.initialize_vector_db()
         
         self.guidelines = self._load_dietary_guidelines()
@@ -37,9 +48,8 @@ class RecipeRecommendationAgent(BaseAgent):
         try:
             print("Connecting to vector database...")
             start_time = time.time()
-            self.client = chromadb.PersistentClient(path=self.db_path)
-            self.collection = self.client.get_collection("recipes")
-            print(f"Connected to vector database successfully in {time.time() - start_time:.2f} seconds")
+            self.index = create_index(self.index_backend, self.db_path, self.numpy_index_path)
+            print(f"Connected to {type(self.index).__name__} successfully in {time.time() - start_time:.2f} seconds")
         except Exception as e:
             print(f"Error connecting to vector database: {str(e)}")
             raise
@@ -68,88 +78,35 @@ class RecipeRecommendationAgent(BaseAgent):
             return pd.DataFrame()
 
     def vector(self, query):
-        return self.model.encode([query])
+        # Cached per normalized query; misses are batched with concurrent requests
+        return self.encoder.encode(query)[None, :]
 
-    def find_similar_recipes(self, query: str, n_results: int = 3) -> Tuple[List[str], List[Dict[str, Any]]]:
+    def find_recipes(self, query: str, n_results: int = 3) -> List[Dict[str, Any]]:
         """
-        Find similar recipes based on user query.
+        Find similar recipes based on user query, already in structured format.
         
         Args:
             query (str): The user's query
             n_results (int): Number of results to return
             
         Returns:
-            Tuple[List[str], List[Dict[str, Any]]]: A tuple containing the list of recipe documents and their metadata
+            List[Dict[str, Any]]: Recipes with id, title, ingredients, instructions, ner and metadata
         """
         try:
             print(f"Starting recipe search for query: '{query}'")
+            recipes = self.index.recipes(self.vector(query)[0], n_results)
             
-            # Get query vector and query the database
-            results = self.collection.query(
-                query_embeddings=self.vector(query).astype(float).tolist(),
-                n_results=n_results
-            )
-            
-            if not results or not results['documents']:
+            if not recipes:
                 print("No results found in vector database")
-                return [], []
-            
-            documents = results['documents'][0]
-            metadatas = results['metadatas'][0]
-            
-            return documents, metadatas
+            return recipes
             
         except Exception as e:
             print(f"Error finding similar recipes: {str(e)}")
-            return [], []
+            return []
 
-    def parse_recipe(self, doc: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse a recipe document into structured format"""
-        try:
-            # Parse the document text to extract recipe components
-            recipe_text = doc.strip()
-            lines = recipe_text.split('\n')
-            
-            # Initialize recipe components
-            title = ""
-            ingredients = []
-            instructions = []
-            ner = []
-            
-            # Parse each line
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if line.startswith('Title:'):
-                    title = line[6:].strip()
-                elif line.startswith('Ingredients:'):
-                    ingredients_text = line[12:].strip()
-                    ingredients = [ing.strip() for ing in ingredients_text.split(',')]
-                elif line.startswith('Instructions:'):
-                    instructions_text = line[13:].strip()
-                    if instructions_text.startswith('[') and instructions_text.endswith(']'):
-                        instructions_text = instructions_text[1:-1]
-                        instructions = [inst.strip().strip("'") for inst in instructions_text.split("', '")]
-                elif line.startswith('NER:'):
-                    ner_text = line[4:].strip()
-                    if ner_text.startswith('[') and ner_text.endswith(']'):
-                        ner_text = ner_text[1:-1]
-                        ner = [item.strip().strip("'") for item in ner_text.split("', '")]
-            
-            return {
-                'title': title,
-                'ingredients': ingredients,
-                'instructions': instructions,
-                'ner': ner,
-                'raw_text': doc,
-                'metadata': metadata
-            }
-            
-        except Exception as e:
-            print(f"Error parsing recipe: {str(e)}")
-            return None
+    def get_recipes(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Recipes returned by an earlier search, by their ids"""
+        return self.index.get_recipes(ids)
 
     def create_system_prompt(self) -> str:
         """Create system prompt with dietary guidelines"""
@@ -176,12 +133,40 @@ class RecipeRecommendationAgent(BaseAgent):
         context += f"\nBased on the above context and the following request, please provide detailed nutritional information for each recipe:\n{user_query}"
         return context
 
-    def process(self, input_data: str) -> Dict[str, Any]:
+    def generate_narrative(self, user_query: str, recipes: List[Dict[str, Any]]) -> str:
+        """Nutritional information for the recipes, written by GPT"""
+        messages = [
+            {"role": "system", "content": self.create_system_prompt()},
+            {"role": "user", "content": self.create_user_prompt(user_query, recipes)}
+        ]
+        response = openai.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=messages,
+            temperature=0.3,
+            max_tokens=2000
+        )
+        return response.choices[0].message.content
+
+    def add_narrative(self, user_query: str, recipes: List[Dict[str, Any]]) -> str:
+        """Generate the narrative for recipes returned without one, and cache it with them"""
+        start_time = time.time()
+        nutritional_info = self.generate_narrative(user_query, recipes)
+        self.answer_cache.put(
+            self.vector(user_query)[0],
+            {"recipes": recipes, "nutritional_info": nutritional_info},
+            time.time() - start_time,
+            self.index.version
+        )
+        return nutritional_info
+
+    def process(self, input_data: str, include_narrative: bool = True) -> Dict[str, Any]:
         """
         Process the user query and return 3 recipes with nutritional information.
         
         Args:
             input_data (str): User query for recipe recommendation
+            include_narrative (bool): Generate the GPT nutritional narrative; when False,
+                nutritional_info is None and can be produced later with generate_narrative
             
         Returns:
             Dict[str, Any]: Dictionary containing recipes and their nutritional information
@@ -190,46 +175,37 @@ class RecipeRecommendationAgent(BaseAgent):
         total_start_time = time.time()
         
         try:
-            # Find similar recipes
-            print("Finding similar recipes...")
-            start_time = time.time()
-            documents, metadatas = self.find_similar_recipes(input_data)
-            print(f"Found similar recipes in {time.time() - start_time:.2f} seconds")
-            
-            if not documents:
-                print("No recipes found for the query")
-                return {"error": "No recipes found matching your query"}
-            
-            # Parse recipes
-            print("Parsing recipes...")
-            start_time = time.time()
-            recipes = []
-            for doc, metadata in zip(documents, metadatas):
-                recipe = self.parse_recipe(doc, metadata)
-                if recipe:
-                    recipes.append(recipe)
-            print(f"Parsed recipes in {time.time() - start_time:.2f} seconds")
-            
-            if not recipes:
-                print("No valid recipes found after parsing")
-                return {"error": "No valid recipes found"}
-            
-            # Create messages for GPT
-            messages = [
-                {"role": "system", "content": self.create_system_prompt()},
-                {"role": "user", "content": self.create_user_prompt(input_data, recipes)}
-            ]
-            
-            # Get recommendation from GPT
-            response = openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                temperature=0.3,
-                max_tokens=2000
-            )
-            
-            nutritional_info = response.choices[0].message.content
-            print("Recipe recommendations generated successfully")
+            # Reuse the answer to a near-identical earlier query against the same index
+            embedding = self.vector(input_data)[0]
+            cached = self.answer_cache.get(embedding, self.index.version)
+            if cached is not None:
+                print(f"Semantic cache hit in {time.time() - total_start_time:.2f} seconds")
+                recipes, nutritional_info = cached["recipes"], cached["nutritional_info"]
+            else:
+                # Find similar recipes, structured at index build time
+                print("Finding similar recipes...")
+                start_time = time.time()
+                recipes = self.find_recipes(input_data)
+                print(f"Found similar recipes in {time.time() - start_time:.2f} seconds")
+                
+                if not recipes:
+                    print("No recipes found for the query")
+                    return {"error": "No recipes found matching your query"}
+                nutritional_info = None
+            
+            # Get recommendation from GPT, unless a cached answer already has one
+            if include_narrative and nutritional_info is None:
+                start_time = time.time()
+                nutritional_info = self.generate_narrative(input_data, recipes)
+                print(f"Recipe recommendations generated in {time.time() - start_time:.2f} seconds")
+            
+            if cached is None or cached["nutritional_info"] != nutritional_info:
+                self.answer_cache.put(
+                    embedding,
+                    {"recipes": recipes, "nutritional_info": nutritional_info},
+                    time.time() - total_start_time,
+                    self.index.version
+                )
             
             return {
                 "recipes": recipes,
@@ -239,4 +215,4 @@ class RecipeRecommendationAgent(BaseAgent):
             
         except Exception as e:
             print(f"Error processing query: {str(e)}")
-            return {"error": str(e)} 
\ No newline at end of file
+            return {"error": str(e)}
\ No newline at end of file
@@ -0,0 +1,101 @@
+import ast
+import numpy as np
+from typing import List, Dict, Any
+
+# Recipe fields stored as lists of strings
+LIST_COLUMNS = ("ingredients", "instructions", "ner")
+
+def parse_list_literal(text: str) -> List[str]:
+    """A "['a', 'b']" list as written by the vector database build, tolerating malformed text"""
+    try:
+        values = ast.literal_eval(text)
+        if isinstance(values, (list, tuple)):
+            return [str(value).strip() for value in values]
+    except (ValueError, SyntaxError):
+        pass
+    if text.startswith('[') and text.endswith(']'):
+        text = text[1:-1]
+    return [value.strip().strip("'\"") for value in text.split("', '") if value.strip()]
+
+def as_list(value) -> List[str]:
+    """A list field of the source dataset, which may hold a list or its string literal"""
+    if isinstance(value, str):
+        return parse_list_literal(value)
+    return [str(item).strip() for item in value if str(item).strip()]
+
+def dataset_recipe(row: Dict[str, Any]) -> Dict[str, Any]:
+    """A row of the source recipe dataset (recipeName, ingredients, steps, NER) as a structured recipe"""
+    return {
+        "title": row["recipeName"].strip(),
+        "ingredients": as_list(row["ingredients"]),
+        "instructions": as_list(row["steps"]),
+        "ner": as_list(row["NER"])
+    }
+
+def parse_document(doc: str) -> Dict[str, Any]:
+    """
+    Parse a recipe document ("Title: ...\nIngredients: ...\nInstructions: [...]\nNER: [...]").
+    The ingredients were joined with ", ", so one containing a comma comes back split;
+    the RecipeStore is built from the dataset's ingredient lists instead
+    """
+    recipe = {"title": "", "ingredients": [], "instructions": [], "ner": []}
+    for line in doc.strip().split('\n'):
+        line = line.strip()
+        if line.startswith('Title:'):
+            recipe["title"] = line[6:].strip()
+        elif line.startswith('Ingredients:'):
+            recipe["ingredients"] = [ing.strip() for ing in line[12:].split(',') if ing.strip()]
+        elif line.startswith('Instructions:'):
+            recipe["instructions"] = parse_list_literal(line[13:].strip())
+        elif line.startswith('NER:'):
+            recipe["ner"] = parse_list_literal(line[4:].strip())
+    return recipe
+
+def encode_strings(values: List[str]):
+    """UTF-8 blob of the strings back to back, and the N+1 byte offsets delimiting them"""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+class RecipeStore:
+    """
+    Recipes parsed once at index build time and stored column by column: each text column
+    is a UTF-8 blob with byte offsets, and each list column adds per-recipe offsets into its
+    flat list of strings. Looking a recipe up by row slices the columns without any parsing.
+    """
+
+    def __init__(self, path: str):
+        with np.load(path) as arrays:
+            self._columns = {name: arrays[name] for name in arrays.files}
+        self._data = {name: self._columns[f"{name}_data"].tobytes() for name in ["title", *LIST_COLUMNS]}
+
+    def __len__(self) -> int:
+        return len(self._columns["title_offsets"]) - 1
+
+    def _string(self, column: str, index: int) -> str:
+        offsets = self._columns[f"{column}_offsets"]
+        return self._data[column][offsets[index]:offsets[index + 1]].decode("utf-8")
+
+    def _list(self, column: str, row: int) -> List[str]:
+        lists = self._columns[f"{column}_lists"]
+        return [self._string(column, index) for index in range(lists[row], lists[row + 1])]
+
+    def get(self, row: int) -> Dict[str, Any]:
+        recipe = {"title": self._string("title", row)}
+        for column in LIST_COLUMNS:
+            recipe[column] = self._list(column, row)
+        return recipe
+
+    @staticmethod
+    def build(recipes: List[Dict[str, Any]], path: str):
+        """Write parsed recipes (dicts with title and the list columns) as a RecipeStore file"""
+        arrays = {}
+        arrays["title_data"], arrays["title_offsets"] = encode_strings([recipe["title"] for recipe in recipes])
+        for column in LIST_COLUMNS:
+            values = [value for recipe in recipes for value in recipe[column]]
+            arrays[f"{column}_data"], arrays[f"{column}_offsets"] = encode_strings(values)
+            lists = np.zeros(len(recipes) + 1, dtype=np.int64)
+            np.cumsum([len(recipe[column]) for recipe in recipes], out=lists[1:])
+            arrays[f"{column}_lists"] = lists
+        np.savez(path, **arrays)
@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+import numpy as np
+from typing import Any, Optional
+
+# Cosine similarity above which a cached answer is reused for a new query
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.environ.get("SEMANTIC_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+# Most answers kept (0 disables the cache)
+SEMANTIC_CACHE_SIZE = int(os.environ.get("SEMANTIC_CACHE_SIZE", "1024"))
+
+class SemanticCache:
+    """
+    Answers keyed on query embeddings. A lookup is a cosine search over the cached
+    embeddings, held in a fixed-size matrix of slots; an answer is reused when the most
+    similar live entry clears the threshold. Entries expire after the TTL, the least
+    recently used one is replaced when the cache is full, and everything is dropped when
+    the recipe index version changes.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+                 max_entries: int = SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.latency_saved_seconds = 0.0
+        self._embeddings = None
+        self._values = [None] * max_entries
+        self._used = np.zeros(max_entries, dtype=bool)
+        self._created = np.zeros(max_entries)
+        self._last_used = np.zeros(max_entries)
+        self._compute_seconds = np.zeros(max_entries)
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._used.any():
+                self.invalidations += 1
+            self._clear()
+            self.version = version
+
+    def _clear(self):
+        self._used[:] = False
+        self._values = [None] * self.max_entries
+
+    def _expire(self, now: float):
+        expired = self._used & (self._created <= now - self.ttl_seconds)
+        for slot in np.flatnonzero(expired):
+            self._values[slot] = None
+        self._used &= ~expired
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        return embedding / max(np.linalg.norm(embedding), 1e-12)
+
+    def get(self, embedding: np.ndarray, version=None) -> Optional[Any]:
+        """The cached answer for the most similar earlier query, or None"""
+        if self.max_entries <= 0:
+            return None
+        now = time.time()
+        with self._lock:
+            self._check_version(version)
+            self._expire(now)
+            if self._embeddings is None or not self._used.any():
+                self.misses += 1
+                return None
+
+            scores = np.where(self._used, self._embeddings @ self._normalize(embedding), -np.inf)
+            slot = int(np.argmax(scores))
+            if scores[slot] < self.threshold:
+                self.misses += 1
+                return None
+            self._last_used[slot] = now
+            self.hits += 1
+            self.latency_saved_seconds += float(self._compute_seconds[slot])
+            return self._values[slot]
+
+    def put(self, embedding: np.ndarray, value: Any, compute_seconds: float, version=None):
+        """Cache an answer that took compute_seconds to produce, replacing a near-identical query's"""
+        if self.max_entries <= 0:
+            return
+        now = time.time()
+        embedding = self._normalize(embedding)
+        with self._lock:
+            self._check_version(version)
+            self._expire(now)
+            if self._embeddings is None or self._embeddings.shape[1] != len(embedding):
+                self._embeddings = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+                self._clear()
+
+            # The entry lookups for this query already return, else a free slot, else the
+            # least recently used entry
+            scores = np.where(self._used, self._embeddings @ embedding, -np.inf)
+            free = np.flatnonzero(~self._used)
+            if self._used.any() and scores.max() >= self.threshold:
+                slot = int(np.argmax(scores))
+            elif len(free):
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+            self._embeddings[slot] = embedding
+            self._values[slot] = value
+            self._used[slot] = True
+            self._created[slot] = now
+            self._last_used[slot] = now
+            self._compute_seconds[slot] = compute_seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "entries": int(self._used.sum()),
+                "invalidations": self.invalidations,
+                "latency_saved_seconds": round(self.latency_saved_seconds, 2),
+                "threshold": self.threshold
+            }
@@ -0,0 +1,152 @@
+import os
+import json
+import numpy as np
+from typing import List, Dict, Any, Tuple
+from .recipe_store import RecipeStore, dataset_recipe, parse_document
+
+class ChromaIndex:
+    """Recipe search through the persistent Chroma collection"""
+
+    def __init__(self, db_path: str, collection_name: str = "recipes"):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=db_path)
+        self.collection = self.client.get_collection(collection_name)
+        # Changes when recipes are added to or removed from the collection
+        self.version = f"chroma:{collection_name}:{self.collection.count()}"
+
+    def top_ids(self, query_embedding: np.ndarray, n_results: int) -> List[str]:
+        """Ids of the most similar recipes, most similar first"""
+        results = self.collection.query(
+            query_embeddings=[np.asarray(query_embedding, dtype=float).tolist()],
+            n_results=n_results,
+            include=[]
+        )
+        return results['ids'][0] if results and results['ids'] else []
+
+    def recipes(self, query_embedding: np.ndarray, n_results: int) -> List[Dict[str, Any]]:
+        """Structured recipes for a query; Chroma only holds documents, so they are parsed here"""
+        results = self.collection.query(
+            query_embeddings=[np.asarray(query_embedding, dtype=float).tolist()],
+            n_results=n_results
+        )
+        if not results or not results['documents']:
+            return []
+        return [
+            {'id': recipe_id, **parse_document(doc), 'metadata': metadata}
+            for recipe_id, doc, metadata in zip(results['ids'][0], results['documents'][0], results['metadatas'][0])
+        ]
+
+    def get_recipes(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Structured recipes by id, in the order given, skipping ids no longer in the collection"""
+        results = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        by_id = {
+            recipe_id: {'id': recipe_id, **parse_document(doc), 'metadata': metadata}
+            for recipe_id, doc, metadata in zip(results['ids'], results['documents'], results['metadatas'])
+        }
+        return [by_id[recipe_id] for recipe_id in ids if recipe_id in by_id]
+
+class NumpyIndex:
+    """
+    Exact cosine search over the recipe embeddings exported from Chroma.
+    The L2-normalized embedding matrix is memory-mapped read-only, so worker processes
+    on the same host share its pages, and a query is one matrix-vector product followed
+    by argpartition for the top k. Recipes come back already parsed from the RecipeStore
+    written alongside the embeddings; the recipe documents themselves are not kept.
+    """
+
+    EMBEDDINGS_FILE = "embeddings.npy"
+    RECORDS_FILE = "records.json"
+    STORE_FILE = "recipes.npz"
+
+    def __init__(self, index_dir: str):
+        embeddings_path = os.path.join(index_dir, self.EMBEDDINGS_FILE)
+        self.embeddings = np.load(embeddings_path, mmap_mode="r")
+        # Changes on every re-export
+        self.version = f"numpy:{os.stat(embeddings_path).st_mtime_ns}:{len(self.embeddings)}"
+        with open(os.path.join(index_dir, self.RECORDS_FILE)) as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.metadatas = records["metadatas"]
+        self.rows = {recipe_id: row for row, recipe_id in enumerate(self.ids)}
+        self.store = RecipeStore(os.path.join(index_dir, self.STORE_FILE))
+
+    @classmethod
+    def exists(cls, index_dir: str) -> bool:
+        # Indexes exported before the recipe store existed need re-exporting
+        return all(
+            os.path.exists(os.path.join(index_dir, name))
+            for name in (cls.EMBEDDINGS_FILE, cls.RECORDS_FILE, cls.STORE_FILE)
+        )
+
+    def search(self, query_embedding: np.ndarray, n_results: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row indices of the n_results most similar recipes, most similar first, and their cosine scores"""
+        query_embedding = np.asarray(query_embedding, dtype=np.float32).ravel()
+        query_embedding = query_embedding / max(np.linalg.norm(query_embedding), 1e-12)
+        scores = self.embeddings @ query_embedding
+
+        n_results = min(n_results, len(scores))
+        if n_results <= 0:
+            return np.array([], dtype=int), np.array([], dtype=np.float32)
+        top = np.argpartition(-scores, n_results - 1)[:n_results]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def top_ids(self, query_embedding: np.ndarray, n_results: int) -> List[str]:
+        """Ids of the most similar recipes, most similar first"""
+        top, _ = self.search(query_embedding, n_results)
+        return [self.ids[i] for i in top]
+
+    def get_recipe(self, row: int) -> Dict[str, Any]:
+        """The structured recipe at an index row"""
+        return {'id': self.ids[row], **self.store.get(row), 'metadata': self.metadatas[row]}
+
+    def get_recipes(self, ids: List[str]) -> List[Dict[str, Any]]:
+        """Structured recipes by id, in the order given, skipping ids not in the index"""
+        return [self.get_recipe(self.rows[recipe_id]) for recipe_id in ids if recipe_id in self.rows]
+
+    def recipes(self, query_embedding: np.ndarray, n_results: int) -> List[Dict[str, Any]]:
+        top, _ = self.search(query_embedding, n_results)
+        return [self.get_recipe(int(i)) for i in top]
+
+    @classmethod
+    def export(cls, collection, dataset_recipes, index_dir: str) -> int:
+        """
+        Write a Chroma collection's embeddings and metadata as a NumpyIndex, with its
+        RecipeStore built from the source dataset rows (dataset_recipes) the collection
+        was created from, whose ingredient lists are kept as they are
+        """
+        results = collection.get(include=["embeddings", "metadatas"])
+
+        # Chroma ids are the recipe's row number in the dataset
+        order = sorted(range(len(results["ids"])), key=lambda i: int(results["ids"][i]))
+        embeddings = np.asarray(results["embeddings"], dtype=np.float32)[order]
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings /= np.maximum(norms, 1e-12)
+
+        ids = [results["ids"][i] for i in order]
+
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(os.path.join(index_dir, cls.EMBEDDINGS_FILE), embeddings)
+        with open(os.path.join(index_dir, cls.RECORDS_FILE), "w") as f:
+            json.dump({
+                "ids": ids,
+                "metadatas": [results["metadatas"][i] for i in order]
+            }, f)
+        RecipeStore.build(
+            [dataset_recipe(dataset_recipes[int(recipe_id)]) for recipe_id in ids],
+            os.path.join(index_dir, cls.STORE_FILE)
+        )
+        return len(order)
+
+def create_index(backend: str, db_path: str, numpy_index_dir: str):
+    """
+    The recipe index for a backend: "chroma", "numpy", or "auto" (the NumPy index when
+    it has been exported, Chroma otherwise)
+    """
+    if backend == "auto":
+        backend = "numpy" if NumpyIndex.exists(numpy_index_dir) else "chroma"
+    if backend == "numpy":
+        return NumpyIndex(numpy_index_dir)
+    if backend == "chroma":
+        return ChromaIndex(db_path)
+    raise ValueError(f"Unknown recipe index backend: {backend}")
@@ -1,7 +1,14 @@
 import modal
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Dict, Optional, Any
+from agents.query_encoder import normalize_query
 
 # Create Modal app
 app = modal.App("nutritional-assistant")
@@ -29,9 +36,20 @@ image = modal.Image.debian_slim().pip_install(
     "/root/vector_database/recipes_vectorstore"
 )
 
+# Exported NumPy recipe index (vector_database/export_numpy_index.py); the recipe agent
+# searches it instead of Chroma when it is present
+if os.path.exists("vector_database/recipes_numpy_index"):
+    image = image.add_local_dir(
+        "vector_database/recipes_numpy_index",
+        "/root/vector_database/recipes_numpy_index"
+    )
+
 # Request/Response models
 class RecipeRequest(BaseModel):
     query: str
+    # The GPT nutritional narrative is slow; by default fetch it afterwards from
+    # /recommend_recipe/{request_id}/narrative
+    include_narrative: bool = False
 
 class Ingredient(BaseModel):
     quantity: str
@@ -44,7 +62,12 @@ class RecipeResponse(BaseModel):
     ingredients: List[Ingredient]  # Keep as List[Ingredient] to match curl output
     instructions: List[str]
     gl_analysis: Dict[str, Any]
-    nutritional_info: Optional[Dict] = None
+    nutritional_info: Optional[str] = None
+    request_id: Optional[str] = None
+
+class NarrativeResponse(BaseModel):
+    request_id: str
+    nutritional_info: str
 
 # Initialize agents
 @app.function(
@@ -66,14 +89,125 @@ def initialize_agents():
     gi_agent = GIAnalysisAgentRoBERTaFinetuned2()
     return recipe_agent, gi_agent
 
+# Container-lifetime agents, built once per container instead of per request
+_agents = {"recipe_agent": None, "gi_agent": None}
+_agents_lock = threading.Lock()
+_warmup_status = {"ready": False, "error": None, "warmup_seconds": None}
+
+def get_agents():
+    """Return this container's agents, building them on first use"""
+    with _agents_lock:
+        if _agents["recipe_agent"] is None:
+            _agents["recipe_agent"], _agents["gi_agent"] = initialize_agents.local()
+    return _agents["recipe_agent"], _agents["gi_agent"]
+
+def warmup_agents():
+    """Build the agents and run a dummy query and ingredient inference through them"""
+    start_time = time.time()
+    try:
+        recipe_agent, gi_agent = get_agents()
+        
+        # Touch the sentence transformer, vector database and RoBERTa model once
+        # find_recipes logs and swallows search errors, so an empty result means the
+        # vector index or recipe store cannot serve and the container must not report ready
+        if not recipe_agent.find_recipes("warmup query"):
+            raise RuntimeError("Recipe search returned no results during warmup")
+        gi_agent.get_gi_value("warmup ingredient")
+        
+        _warmup_status["warmup_seconds"] = round(time.time() - start_time, 2)
+        _warmup_status["ready"] = True
+        print(f"Agents warmed up in {_warmup_status['warmup_seconds']:.2f} seconds")
+    except Exception as e:
+        _warmup_status["error"] = str(e)
+        print(f"Error warming up agents: {str(e)}")
+
+def agents_ready() -> bool:
+    return _warmup_status["ready"]
+
+class ThreadSingleFlight:
+    """
+    Request coalescing across the threads serving sync endpoints: the first thread with a
+    key runs the computation, and threads arriving meanwhile block on its Future
+    """
+    
+    def __init__(self):
+        self.calls = 0
+        self.deduplicated = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+    
+    def do(self, key, compute):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+                self.calls += 1
+            else:
+                self.deduplicated += 1
+        if not leader:
+            return future.result()
+        
+        try:
+            result = compute()
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {"upstream_calls": self.calls, "deduplicated": self.deduplicated, "in_flight": len(self._in_flight)}
+
+# Identical recipe queries arriving together run the recipe and GI pipeline once
+recipe_flight = ThreadSingleFlight()
+
+# The query and recipe ids of recent responses returned without a narrative, by request
+# ID, so it can be generated on request. Kept in a Modal Dict because the follow-up request
+# may reach any container; Modal drops entries left idle for days, expired ones are
+# removed on read
+NARRATIVE_TTL_SECONDS = float(os.environ.get("NARRATIVE_TTL_SECONDS", "3600"))
+narrative_store = modal.Dict.from_name("recipe-narratives", create_if_missing=True)
+narrative_flight = ThreadSingleFlight()
+
+def defer_narrative(query: str, recipes: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Keep what generating the narrative for a response needs, returning its request ID,
+    or None when it could not be stored (the response is still served, without one)
+    """
+    request_id = uuid.uuid4().hex
+    try:
+        narrative_store[request_id] = {
+            "query": query,
+            "recipe_ids": [recipe["id"] for recipe in recipes],
+            "created": time.time(),
+            "narrative": None
+        }
+    except Exception as e:
+        print(f"Error deferring narrative: {str(e)}")
+        return None
+    return request_id
+
+def get_deferred_narrative(request_id: str) -> Optional[Dict[str, Any]]:
+    entry = narrative_store.get(request_id)
+    if entry is not None and time.time() - entry["created"] > NARRATIVE_TTL_SECONDS:
+        narrative_store.pop(request_id, None)
+        entry = None
+    return entry
+
 # Process recipe request
 @app.function(
     image=image
 )
-def process_recipe_request(query: str, recipe_agent, gi_agent):
+def process_recipe_request(query: str, recipe_agent, gi_agent, include_narrative: bool = False):
     try:
         # Get recipes
-        recipe_results = recipe_agent.process(query)
+        recipe_results = recipe_agent.process(query, include_narrative=include_narrative)
         if 'error' in recipe_results:
             return {"error": recipe_results['error']}
         
@@ -97,8 +231,11 @@ def process_recipe_request(query: str, recipe_agent, gi_agent):
                 ) for ing in best_recipe['ingredients']
             ],
             instructions=best_recipe['instructions'],
-            gl_analysis=best_recipe['gl_analysis']
+            gl_analysis=best_recipe['gl_analysis'],
+            nutritional_info=recipe_results.get('nutritional_info')
         )
+        if recipe_response.nutritional_info is None:
+            recipe_response.request_id = defer_narrative(query, recipe_results['recipes'])
         
         return recipe_response.dict()
     except Exception as e:
@@ -116,17 +253,26 @@ def process_recipe_request(query: str, recipe_agent, gi_agent):
 def fastapi_app():
     web_app = FastAPI()
     
+    @web_app.on_event("startup")
+    def start_warmup():
+        # Warm up in the background so /ready can answer while models load
+        threading.Thread(target=warmup_agents, daemon=True).start()
+    
+    @web_app.get("/ready")
+    def ready():
+        status_code = 200 if _warmup_status["ready"] else 503
+        return JSONResponse(status_code=status_code, content=_warmup_status)
+    
     @web_app.post("/recommend_recipe")
     def recommend_recipe(request: RecipeRequest):
         try:
-            # Initialize agents
-            recipe_agent, gi_agent = initialize_agents.local()
+            # Reuse the container's agents (blocks until warmup has built them)
+            recipe_agent, gi_agent = get_agents()
             
-            # Process request
-            result = process_recipe_request.local(
-                request.query,
-                recipe_agent,
-                gi_agent
+            # Process request, sharing the result with identical concurrent queries
+            result = recipe_flight.do(
+                (normalize_query(request.query), request.include_narrative),
+                lambda: process_recipe_request.local(request.query, recipe_agent, gi_agent, request.include_narrative)
             )
             
             if "error" in result:
@@ -136,4 +282,41 @@ def fastapi_app():
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
     
+    @web_app.get("/recommend_recipe/{request_id}/narrative", response_model=NarrativeResponse)
+    def recommend_recipe_narrative(request_id: str):
+        entry = get_deferred_narrative(request_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired request ID")
+        
+        def generate():
+            # Generated once per request ID, however many times it is fetched, and kept in
+            # the semantic cache for later queries like this one
+            if entry["narrative"] is None:
+                recipe_agent, _ = get_agents()
+                recipes = recipe_agent.get_recipes(entry["recipe_ids"])
+                if len(recipes) != len(entry["recipe_ids"]):
+                    raise HTTPException(status_code=404, detail="The recipes of this request are no longer available")
+                entry["narrative"] = recipe_agent.add_narrative(entry["query"], recipes)
+                try:
+                    narrative_store[request_id] = entry
+                except Exception as e:
+                    print(f"Error storing narrative: {str(e)}")
+            return entry["narrative"]
+        
+        try:
+            narrative = narrative_flight.do(request_id, generate)
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        return NarrativeResponse(request_id=request_id, nutritional_info=narrative)
+    
+    @web_app.get("/metrics")
+    def metrics():
+        stats = {"singleflight": recipe_flight.stats(), "narrative_singleflight": narrative_flight.stats()}
+        if _agents["recipe_agent"] is not None:
+            stats["query_encoder"] = _agents["recipe_agent"].encoder.stats()
+            stats["semantic_cache"] = _agents["recipe_agent"].answer_cache.stats()
+        return stats
+    
     return web_app
\ No newline at end of file
@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from sentence_transformers import SentenceTransformer
+
+# Check that the NumPy recipe index returns the same recipes as Chroma, and compare
+# their query latency. Queries are the titles of the test recipes.
+# Usage: python vector_database/benchmark_vector_index.py --n-results 3
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+from agents.vector_index import ChromaIndex, NumpyIndex
+from test_data.simple.simple_recipes import SIMPLE_RECIPES
+from test_data.low_gi.low_gi_recipes import LOW_GI_RECIPES
+from test_data.high_gi.high_gi_recipes import HIGH_GI_RECIPES
+
+parser = argparse.ArgumentParser(description="NumPy vs Chroma recipe index parity and latency")
+parser.add_argument("--db-path", default=os.path.join(current_dir, "recipes_vectorstore"))
+parser.add_argument("--index-dir", default=os.path.join(current_dir, "recipes_numpy_index"))
+parser.add_argument("--n-results", type=int, default=3)
+parser.add_argument("--runs", type=int, default=20, help="Timed repetitions of every query")
+args = parser.parse_args()
+
+queries = [recipe["title"] for recipe in SIMPLE_RECIPES + LOW_GI_RECIPES + HIGH_GI_RECIPES]
+model = SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
+query_embeddings = model.encode(queries)
+
+chroma_index = ChromaIndex(args.db_path)
+numpy_index = NumpyIndex(args.index_dir)
+print(f"{len(queries)} queries against {len(numpy_index.ids)} recipes")
+
+# Parity: Chroma's HNSW search is approximate, so compare the sets and the order
+overlaps, same_order = [], 0
+for query, embedding in zip(queries, query_embeddings):
+    chroma_ids = chroma_index.top_ids(embedding, args.n_results)
+    numpy_ids = numpy_index.top_ids(embedding, args.n_results)
+    overlaps.append(len(set(chroma_ids) & set(numpy_ids)) / max(len(chroma_ids), 1))
+    same_order += chroma_ids == numpy_ids
+    if chroma_ids != numpy_ids:
+        print(f"Differs for '{query}'")
+recall = float(np.mean(overlaps))
+print(f"Top-{args.n_results} overlap with Chroma: {recall:.4f}; identical ranking for {same_order}/{len(queries)} queries")
+
+# Latency
+results = []
+for name, index in [("chroma", chroma_index), ("numpy", numpy_index)]:
+    index.top_ids(query_embeddings[0], args.n_results)  # Warm up
+    latencies = []
+    for _ in range(args.runs):
+        for embedding in query_embeddings:
+            start_time = time.perf_counter()
+            index.top_ids(embedding, args.n_results)
+            latencies.append(time.perf_counter() - start_time)
+    results.append({
+        'backend': name,
+        'queries': len(latencies),
+        'mean_latency_ms': round(float(np.mean(latencies)) * 1000, 3),
+        'p50_latency_ms': round(float(np.percentile(latencies, 50)) * 1000, 3),
+        'p95_latency_ms': round(float(np.percentile(latencies, 95)) * 1000, 3),
+        'p99_latency_ms': round(float(np.percentile(latencies, 99)) * 1000, 3),
+        'top_k_overlap_with_chroma': 1.0 if name == "chroma" else round(recall, 4)
+    })
+    print(results[-1])
+
+# Save results
+os.makedirs(os.path.join(os.path.dirname(current_dir), "performance_analysis", "performance_data"), exist_ok=True)
+csv_path = os.path.join(os.path.dirname(current_dir), "performance_analysis", "performance_data", "vector_index_benchmark.csv")
+pd.DataFrame(results).to_csv(csv_path, index=False)
+print(f"\nBenchmark results saved to: {csv_path}")
+print(pd.DataFrame(results).to_string(index=False))
@@ -0,0 +1,28 @@
+import os
+import sys
+import argparse
+import chromadb
+from datasets import load_dataset
+
+# Export the Chroma recipe collection as the memory-mapped NumPy index used by
+# RecipeRecommendationAgent (RECIPE_INDEX_BACKEND=auto picks it up once it exists),
+# along with the source dataset's recipes in a columnar store so queries return them
+# structured. The dataset must be the one create_vector_db.ipynb built the collection from.
+# Usage: python vector_database/export_numpy_index.py
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.dirname(current_dir))
+from agents.vector_index import NumpyIndex
+
+parser = argparse.ArgumentParser(description="Export the Chroma recipe collection as a NumPy index")
+parser.add_argument("--db-path", default=os.path.join(current_dir, "recipes_vectorstore"))
+parser.add_argument("--output-dir", default=os.path.join(current_dir, "recipes_numpy_index"))
+parser.add_argument("--dataset", default="ashikan/diabetic-friendly-recipes")
+args = parser.parse_args()
+
+collection = chromadb.PersistentClient(path=args.db_path).get_collection("recipes")
+dataset_recipes = load_dataset(args.dataset)['train']
+count = NumpyIndex.export(collection, dataset_recipes, args.output_dir)
+size_mb = os.path.getsize(os.path.join(args.output_dir, NumpyIndex.EMBEDDINGS_FILE)) / (1024 * 1024)
+store_mb = os.path.getsize(os.path.join(args.output_dir, NumpyIndex.STORE_FILE)) / (1024 * 1024)
+print(f"Exported {count} recipes ({size_mb:.1f} MB of embeddings, {store_mb:.1f} MB of parsed recipes) to: {args.output_dir}")